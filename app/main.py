@@ -1,17 +1,39 @@
 from fastapi import FastAPI, HTTPException, status, Request, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, Field, conint
-from typing import List, Optional, Dict, Union, Any
+from pydantic import BaseModel, Field, conint, confloat
+from typing import List, Optional, Dict, Union, Any, Literal, Tuple, TypedDict
 import logging
 import uvicorn
 import os
 from contextvars import ContextVar
 from pythonjsonlogger import jsonlogger
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from contextlib import asynccontextmanager, contextmanager
+from prometheus_client import Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest
 import uuid
+import sys
+import json
+import time
+import threading
+import unicodedata
+import hashlib
+import math
+import sqlite3
+import re
+import numpy as np
+from array import array
+from collections import OrderedDict
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient, models
+from qdrant_client import AsyncQdrantClient, models
 import ollama
+import httpx
+import asyncio
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback, see dumps_json
+    orjson = None
 
 # ======== Configuration ========
 load_dotenv()
@@ -40,11 +62,127 @@ QDRANT_HOST = os.getenv("QDRANT_HOST", "192.168.153.47")
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "192.168.153.46")
 REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "30"))
 CONTEXT_WINDOW_SIZE = int(os.getenv("CONTEXT_WINDOW_SIZE", "5"))
+# Characters of text returned per result with response_mode="snippet"
+SNIPPET_CHARS = int(os.getenv("SNIPPET_CHARS", "600"))
+# Named search profiles for SearchRequest.search_profile (keys as in SearchTuning);
+# "default" leaves the collection's HNSW and quantization settings untouched
+SEARCH_PROFILES = {
+    "default": {},
+    "fast": {"hnsw_ef": 32, "rescore": False},
+    "balanced": {"hnsw_ef": 128, "rescore": True, "oversampling": 1.5},
+    "accurate": {"hnsw_ef": 512, "rescore": True, "oversampling": 3.0},
+}
+DEFAULT_SEARCH_PROFILE = os.getenv("DEFAULT_SEARCH_PROFILE", "default")
+if DEFAULT_SEARCH_PROFILE not in SEARCH_PROFILES:
+    raise ValueError(f"DEFAULT_SEARCH_PROFILE must be one of {sorted(SEARCH_PROFILES)}")
+
+# Query embedding cache (shared across SearchSystem instances)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "3600"))
+# Persistent embedding store shared by the worker processes of a host (SQLite); empty disables
+EMBEDDING_STORE_PATH = os.getenv("EMBEDDING_STORE_PATH", "")
+EMBEDDING_STORE_MAX_BYTES = int(os.getenv("EMBEDDING_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Most recently used vectors read at startup so they are in the OS page cache
+EMBEDDING_STORE_WARM = int(os.getenv("EMBEDDING_STORE_WARM", "10000"))
+
+# Context page cache, keyed by (endpoint, collection, filename, page_number)
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "600"))
+
+# Whole /search response cache, keyed by a hash of the request and resolved endpoint
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+# Compiled Qdrant filters, per kind (request filters, context scroll filters); 0 disables
+FILTER_CACHE_SIZE = int(os.getenv("FILTER_CACHE_SIZE", "1024"))
+
+# Collection existence memoization, keyed by (endpoint, collection)
+COLLECTION_CACHE_TTL = float(os.getenv("COLLECTION_CACHE_TTL", "300"))
+# Create missing collections on read paths (disable to reject unknown collection names)
+AUTO_CREATE_COLLECTIONS = os.getenv("AUTO_CREATE_COLLECTIONS", "true").lower() == "true"
+
+# Filename catalog used by /search/filenames
+FILENAME_CATALOG_TTL = float(os.getenv("FILENAME_CATALOG_TTL", "300"))
+FILENAME_CATALOG_MAX_FILES = int(os.getenv("FILENAME_CATALOG_MAX_FILES", "100000"))
+# Catalogs kept per (endpoint, collection); least recently used ones are dropped first
+FILENAME_CATALOG_MAX_COLLECTIONS = max(1, int(os.getenv("FILENAME_CATALOG_MAX_COLLECTIONS", "32")))
+FILENAME_MIN_SCORE = float(os.getenv("FILENAME_MIN_SCORE", "0.5"))
+# Share of the score from query-token containment (rest: trigram similarity)
+FILENAME_TOKEN_WEIGHT = float(os.getenv("FILENAME_TOKEN_WEIGHT", "0.7"))
+# Requests scoring more than this many filenames (catalog size x queries) are matched
+# in a worker thread instead of on the event loop
+FILENAME_MATCH_INLINE_MAX = int(os.getenv("FILENAME_MATCH_INLINE_MAX", "100000"))
+
+# Batched embedding: one /api/embed call per EMBED_BATCH_SIZE queries
+OLLAMA_BATCH_EMBED = os.getenv("OLLAMA_BATCH_EMBED", "true").lower() == "true"
+EMBED_BATCH_SIZE = max(1, int(os.getenv("EMBED_BATCH_SIZE", "64")))
+# How long Ollama keeps the embedding model loaded after each call ("30m", "-1" = forever);
+# empty leaves the Ollama server default (5m)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "").strip() or None
+if OLLAMA_KEEP_ALIVE and re.fullmatch(r"-?\d+(\.\d+)?", OLLAMA_KEEP_ALIVE):
+    # Bare numbers are seconds; Ollama only accepts them as JSON numbers
+    OLLAMA_KEEP_ALIVE = float(OLLAMA_KEEP_ALIVE)
+
+# Cross-request micro-batching: queries of concurrent /search requests for the same
+# (endpoint, collection, embedding_model) share one embed and one query_batch_points
+# call. MICROBATCH_WINDOW_MS is the longest a query waits for others (0 disables).
+MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", "0"))
+MICROBATCH_MAX_BATCH = max(1, int(os.getenv("MICROBATCH_MAX_BATCH", "64")))
+
+# Connection pooling (async clients)
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "4"))
+# Clients for requests overriding qdrant_url/qdrant_api_key/qdrant_verify_ssl
+QDRANT_CLIENT_POOL_SIZE = int(os.getenv("QDRANT_CLIENT_POOL_SIZE", "32"))
+QDRANT_CLIENT_IDLE_TIMEOUT = float(os.getenv("QDRANT_CLIENT_IDLE_TIMEOUT", "300"))
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "100"))
 
 # Embedding configuration
 DEFAULT_EMBEDDING_MODEL = os.getenv("DEFAULT_EMBEDDING_MODEL", "mxbai-embed-large")
 DEFAULT_VECTOR_SIZE = int(os.getenv("DEFAULT_VECTOR_SIZE", "1024"))
 
+# Two-stage retrieval: candidates from a named coarse vector (quantized and/or a
+# low-dimensional Matryoshka prefix of the embedding) are rescored with the
+# full-precision vector in the same query. Empty COARSE_VECTOR_NAME disables it.
+COARSE_VECTOR_NAME = os.getenv("COARSE_VECTOR_NAME", "")
+DENSE_VECTOR_NAME = os.getenv("DENSE_VECTOR_NAME", "dense" if COARSE_VECTOR_NAME else "")
+COARSE_VECTOR_SIZE = int(os.getenv("COARSE_VECTOR_SIZE", "0"))  # 0: same as the full embedding
+COARSE_QUANTIZATION = os.getenv("COARSE_QUANTIZATION", "binary")
+if COARSE_QUANTIZATION not in ("none", "scalar", "binary"):
+    raise ValueError("COARSE_QUANTIZATION must be one of none, scalar, binary")
+PREFETCH_OVERSAMPLING = float(os.getenv("PREFETCH_OVERSAMPLING", "4"))
+TWO_STAGE_SEARCH = os.getenv("TWO_STAGE_SEARCH", "false").lower() == "true"
+QDRANT_DEFAULT_LIMIT = 10  # results of a query sent without a limit
+
+# Startup warmup, run in the background by the FastAPI lifespan; /ready answers 503 until
+# the pooled clients answer and the preload steps below have finished
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+# Pooled Qdrant clients to open and check: dev and/or prod. Defaults to the pools with a
+# configured endpoint (dev: DEV_QDRANT_URL, QDRANT_URL or QDRANT_HOST; prod: PROD_QDRANT_URL),
+# so readiness never waits on an unused fallback host
+WARMUP_POOLS = [p.strip() for p in os.getenv("WARMUP_POOLS", ",".join(
+    pool for pool, url in (("dev", DEV_QDRANT_URL or QDRANT_URL or os.getenv("QDRANT_HOST")), ("prod", PROD_QDRANT_URL))
+    if url
+) or "dev").split(",") if p.strip()]
+if set(WARMUP_POOLS) - {"dev", "prod"}:
+    raise ValueError("WARMUP_POOLS entries must be dev or prod")
+# Collections (comma separated) whose filename catalogs are built and hot queries searched
+WARMUP_COLLECTIONS = [c.strip() for c in os.getenv("WARMUP_COLLECTIONS", "").split(",") if c.strip()]
+# Text file with one hot query per line ("#" starts a comment line)
+WARMUP_QUERIES_FILE = os.getenv("WARMUP_QUERIES_FILE", "")
+WARMUP_CONCURRENCY = max(1, int(os.getenv("WARMUP_CONCURRENCY", "4")))
+# Seconds the preload steps may take before the process reports ready anyway
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "120"))
+# Seconds between connectivity checks while Qdrant or Ollama does not answer
+WARMUP_RETRY_INTERVAL = float(os.getenv("WARMUP_RETRY_INTERVAL", "5"))
+
+# Sampling interval of the stack profiler behind profile=true on /search
+PROFILE_INTERVAL_MS = max(1.0, float(os.getenv("PROFILE_INTERVAL_MS", "5")))
+
+# Most distinct collection / embedding model values each metric label may take. Only
+# collections confirmed to exist and models that embedded successfully (plus
+# DEFAULT_EMBEDDING_MODEL) get their own series; anything else is reported as "other"
+METRICS_MAX_LABEL_VALUES = max(1, int(os.getenv("METRICS_MAX_LABEL_VALUES", "64")))
+
 # API Key Authentication
 API_KEY = os.getenv("API_KEY", "")
 API_KEY_ENABLED = os.getenv("API_KEY_ENABLED", "false").lower() == "true"
@@ -158,56 +296,1114 @@ class EmbeddingError(SearchException):
 
 class QdrantConnectionError(SearchException):
     """Exception for Qdrant connection issues"""
+
+class CollectionNotFoundError(SearchException):
+    """Exception for missing collections when AUTO_CREATE_COLLECTIONS is disabled"""
+
+class InvalidFilterError(SearchException):
+    """Exception for request filters rejected before any Qdrant call"""
+# ===============================
+
+# ======== Metrics ========
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Backend a failure in each search stage is attributed to. Context scroll failures
+# do not fail the stage; _fetch_context counts them itself
+STAGE_SERVICES = {"embedding": "ollama", "vector_search": "qdrant"}
+
+REQUEST_LATENCY = Histogram(
+    "search_api_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    "search_api_stage_duration_seconds",
+    "Latency of each search stage (filter, embedding, vector_search, context, serialization)",
+    ["stage", "collection", "embedding_model"], buckets=LATENCY_BUCKETS
+)
+BACKEND_ERRORS = Counter(
+    "search_api_backend_errors_total", "Failed Qdrant and Ollama calls",
+    ["service", "collection", "embedding_model"]
+)
+SEARCH_RESULTS = Counter(
+    "search_api_results_total", "Search results returned",
+    ["collection", "embedding_model"]
+)
+CONTEXT_PAGES = Counter(
+    "search_api_context_pages_total",
+    "Context pages scrolled from Qdrant to expand hits (page cache hits are not counted)",
+    ["collection", "embedding_model"]
+)
+FILTER_COMPILE_LATENCY = Histogram(
+    "search_api_filter_compile_seconds", "Time to build a Qdrant filter on a compiled-filter cache miss",
+    ["kind"], buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025)
+)
+FILTERS_REJECTED = Counter(
+    "search_api_filters_rejected_total", "Request filters rejected as invalid"
+)
+
+class LabelAllowlist:
+    """
+    Bounded set of request-supplied values allowed as metric label values.
+
+    Requests pick collection and embedding model freely; labeling metrics with
+    raw values would let any client add series to /metrics without bound.
+    """
+    OTHER = "other"
+
+    def __init__(self, max_values: int, initial: Tuple[str, ...] = ()):
+        self.max_values = max_values
+        self._values = set(initial)
+
+    def add(self, value: str):
+        if value not in self._values and len(self._values) < self.max_values:
+            self._values.add(value)
+
+    def label(self, value: str) -> str:
+        return value if value in self._values else self.OTHER
+
+METRIC_COLLECTIONS = LabelAllowlist(METRICS_MAX_LABEL_VALUES)
+METRIC_MODELS = LabelAllowlist(METRICS_MAX_LABEL_VALUES, (DEFAULT_EMBEDDING_MODEL,))
+
+def metric_labels(collection: str, embedding_model: str) -> Tuple[str, str]:
+    """Collection and embedding model label values; unconfirmed values are folded into OTHER"""
+    return METRIC_COLLECTIONS.label(collection), METRIC_MODELS.label(embedding_model)
+
+# Stage durations (seconds) of the current request, rendered as the Server-Timing header
+stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+def record_stage(stage: str, seconds: float):
+    timings = stage_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+@contextmanager
+def server_timing(stage: str):
+    """Time a stage for the Server-Timing header only"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+@contextmanager
+def observe_stage(stage: str, collection: str, embedding_model: str):
+    """Time one search stage; failures of backend stages count as Qdrant/Ollama errors"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        service = STAGE_SERVICES.get(stage)
+        if service:
+            BACKEND_ERRORS.labels(service, *metric_labels(collection, embedding_model)).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.labels(stage, *metric_labels(collection, embedding_model)).observe(elapsed)
+        record_stage(stage, elapsed)
+
+def format_server_timing(timings: Dict[str, float], total: float) -> str:
+    entries = list(timings.items()) + [("total", total)]
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in entries)
+# ===============================
+
+# ======== Profiling ========
+class StackSampler:
+    """
+    Wall-clock sampling profiler for one thread.
+
+    While active, a daemon thread records the target thread's call stack every
+    `interval` seconds. Profiling the event loop thread shows where it spends
+    CPU time; time spent waiting on Qdrant or Ollama shows up as the loop's
+    selector poll. Other requests served concurrently by the same loop appear
+    in the samples too.
+    """
+    MAX_DEPTH = 64
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self._stacks: Dict[tuple, int] = {}
+        self._ticks = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._started = 0.0
+        self.duration = 0.0
+
+    def __enter__(self) -> "StackSampler":
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._ticks += 1
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = self._stack_key(frame)
+                self._stacks[stack] = self._stacks.get(stack, 0) + 1
+
+    @classmethod
+    def _stack_key(cls, frame) -> tuple:
+        """Frames from outermost to innermost as "file:function:line" strings"""
+        frames = []
+        while frame is not None and len(frames) < cls.MAX_DEPTH:
+            code = frame.f_code
+            frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return tuple(reversed(frames))
+
+    def report(self, limit: int = 25) -> Dict[str, Any]:
+        """Hottest functions (self and inclusive time) and collapsed stacks"""
+        ms_per_sample = self.duration * 1000 / self._ticks if self._ticks else 0.0
+        self_samples: Dict[str, int] = {}
+        total_samples: Dict[str, int] = {}
+        for stack, count in self._stacks.items():
+            functions = [frame.rsplit(":", 1)[0] for frame in stack]
+            self_samples[functions[-1]] = self_samples.get(functions[-1], 0) + count
+            for function in set(functions):
+                total_samples[function] = total_samples.get(function, 0) + count
+        hottest = sorted(total_samples, key=lambda f: (-self_samples.get(f, 0), -total_samples[f]))[:limit]
+        return {
+            "duration_ms": round(self.duration * 1000, 2),
+            "interval_ms": self.interval * 1000,
+            "samples": sum(self._stacks.values()),
+            "functions": [
+                {
+                    "function": function,
+                    "self_ms": round(self_samples.get(function, 0) * ms_per_sample, 2),
+                    "total_ms": round(total_samples[function] * ms_per_sample, 2)
+                }
+                for function in hottest
+            ],
+            # Collapsed stacks ("outer;...;inner"), as consumed by flame graph tools
+            "stacks": [
+                {"stack": ";".join(stack), "samples": count}
+                for stack, count in sorted(self._stacks.items(), key=lambda item: -item[1])[:limit]
+            ]
+        }
+# ===============================
+
+# ======== Response Serialization ========
+class PageResult(TypedDict):
+    filename: str
+    score: float
+    center_page: int
+    combined_page: str
+    page_numbers: List[int]
+
+class GenericResult(TypedDict, total=False):
+    score: float
+    filename: str
+    metadata: Dict[str, Any]
+
+SearchResult = Union[PageResult, GenericResult]
+
+class FilenameMatch(TypedDict):
+    filename: str
+    score: float
+
+class FilenameSearchResponse(TypedDict):
+    query: str
+    total_matches: int
+    filenames: List[FilenameMatch]
+
+def dumps_json(content: Any) -> bytes:
+    """Encode a response body: orjson when installed, else the stdlib settings JSONResponse uses"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with dumps_json.
+
+    Handlers return it with plain dicts and lists (see the TypedDicts above), so
+    FastAPI's jsonable_encoder pass over the body is skipped as well.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+# ===============================
+
+# ======== Caching ========
+_MISSING = object()
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live.
+
+    Entries are evicted least-recently-used first once max_size entries (or, with
+    a weigher, max_weight total weight) are exceeded and are dropped lazily when
+    read after expiry. A max_size or max_weight of 0 disables the cache, a
+    max_size of None leaves the entry count unbounded and a ttl of 0 keeps
+    entries until they are evicted.
+    """
+
+    def __init__(self, max_size: Optional[int], ttl: float,
+                 max_weight: Optional[int] = None, weigher=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weigher = weigher
+        self.weight = 0
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, weight, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.weight -= weight
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.max_size == 0 or self.max_weight == 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        weight = self.weigher(value) if self.weigher else 0
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.weight -= previous[1]
+            self._data[key] = (expires_at, weight, value)
+            self.weight += weight
+            while self._data and (
+                (self.max_size is not None and len(self._data) > self.max_size) or
+                (self.max_weight is not None and self.weight > self.max_weight)
+            ):
+                _, (_, evicted_weight, _) = self._data.popitem(last=False)
+                self.weight -= evicted_weight
+                self.evictions += 1
+
+    def invalidate(self, predicate=None) -> int:
+        """Drop every entry whose key matches predicate (all entries if None)"""
+        with self._lock:
+            if predicate is None:
+                removed = len(self._data)
+                self._data.clear()
+                self.weight = 0
+                return removed
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                self.weight -= self._data.pop(key)[1]
+            return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats = {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+        if self.weigher:
+            stats["weight"] = self.weight
+            stats["max_weight"] = self.max_weight
+        return stats
+
+
+class QdrantClientPool:
+    """
+    Bounded LRU pool of async Qdrant clients for per-request connection overrides.
+
+    Clients are keyed by their resolved connection settings and reference-counted
+    while a request uses them. Idle clients are closed once the pool grows past
+    max_size or after idle_timeout seconds without use; clients in use are never
+    closed underneath a request. Besides acquire/release, a sweeper task started
+    with the app checks for idle clients every idle_timeout / 2 seconds, so they
+    are closed even when override traffic stops.
+    """
+
+    def __init__(self, max_size: int, idle_timeout: float):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        # key -> [client, in_use, last_used]
+        self._entries: "OrderedDict[tuple, list]" = OrderedDict()
+        self._closing = set()
+        self._sweeper: Optional["asyncio.Task"] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def start_sweeper(self):
+        if self.idle_timeout > 0 and self._sweeper is None:
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep())
+
+    async def stop_sweeper(self):
+        if self._sweeper is None:
+            return
+        self._sweeper.cancel()
+        try:
+            await self._sweeper
+        except asyncio.CancelledError:
+            pass
+        self._sweeper = None
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.idle_timeout / 2)
+            self._evict()
+
+    def acquire(self, key: tuple, factory):
+        """Return the pooled client for key, creating it with factory() on a miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            entry = [factory(), 0, time.monotonic()]
+            self._entries[key] = entry
+        else:
+            self.hits += 1
+        entry[1] += 1
+        self._entries.move_to_end(key)
+        self._evict()
+        return entry[0]
+
+    def retain(self, key: tuple):
+        """Take an extra reference on a client that is already in use"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[1] += 1
+
+    def release(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[1] = max(0, entry[1] - 1)
+            entry[2] = time.monotonic()
+        self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        idle_keys = [key for key, (_, in_use, _) in self._entries.items() if in_use == 0]
+        overflow = len(self._entries) - self.max_size
+        expired = []
+        for key in idle_keys:
+            _, _, last_used = self._entries[key]
+            if overflow > 0 or (self.idle_timeout > 0 and now - last_used > self.idle_timeout):
+                expired.append(self._entries.pop(key)[0])
+                overflow -= 1
+        for client in expired:
+            self.evictions += 1
+            self._close_later(client)
+
+    def _close_later(self, client):
+        try:
+            task = asyncio.get_running_loop().create_task(client.close())
+        except RuntimeError:
+            return
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def close_all(self):
+        clients = [client for client, _, _ in self._entries.values()]
+        self._entries.clear()
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.debug(f"Closing pooled Qdrant client failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "open_clients": len(self._entries),
+            "in_use": sum(1 for _, in_use, _ in self._entries.values() if in_use),
+            "max_size": self.max_size,
+            "idle_timeout_seconds": self.idle_timeout,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def filename_trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def filename_tokens(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens; dots are kept so versions like 9.3.6 stay whole"""
+    return [t for t in re.split(r"[^0-9a-z.]+", text.lower()) if t.strip(".")]
+
+
+class FilenameCatalog:
+    """
+    In-memory list of the distinct metadata.filename values of one collection.
+
+    Queries are ranked with a blend of token containment (share of query tokens
+    found in the filename) and trigram Dice similarity, computed for all
+    filenames at once with numpy. An exact case-insensitive match scores 1.0.
+
+    Both parts are answered from indexes built here: trigram postings over the
+    filenames, and postings of the distinct filename tokens with a trigram index
+    over those tokens. A query token occurs in a filename exactly when it occurs
+    in one of the filename's tokens, so containment only scans matching tokens.
+    """
+
+    def __init__(self, filenames: List[str], points_count: Optional[int] = None):
+        self.filenames = sorted(set(filenames))
+        self.points_count = points_count
+        self.built_at = time.monotonic()
+        lower = [f.lower() for f in self.filenames]
+
+        # Case-insensitive exact matches
+        self._exact: Dict[str, List[int]] = {}
+        postings: Dict[str, List[int]] = {}
+        trigram_counts = []
+        for index, name in enumerate(lower):
+            self._exact.setdefault(name, []).append(index)
+            trigrams = filename_trigrams(name)
+            trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                postings.setdefault(trigram, []).append(index)
+        self._trigram_counts = np.array(trigram_counts, dtype=np.float32)
+        self._postings = {t: np.array(ids, dtype=np.int32) for t, ids in postings.items()}
+
+        token_postings: Dict[str, List[int]] = {}
+        for index, name in enumerate(lower):
+            for token in set(filename_tokens(name)):
+                token_postings.setdefault(token, []).append(index)
+        # Tokens by each of their substrings of up to three characters
+        token_grams: Dict[str, List[int]] = {}
+        for token_id, token in enumerate(token_postings):
+            grams = {token[i:i + n] for n in (1, 2, 3) for i in range(len(token) - n + 1)}
+            for gram in grams:
+                token_grams.setdefault(gram, []).append(token_id)
+        # A plain list: a fixed-width numpy string array would pad every token to the longest one
+        self._tokens = list(token_postings)
+        # Postings of all tokens back to back; token i owns [offsets[i], offsets[i + 1])
+        self._token_files = np.array([i for ids in token_postings.values() for i in ids], dtype=np.int32)
+        self._token_offsets = np.cumsum([0] + [len(ids) for ids in token_postings.values()], dtype=np.int64)
+        self._token_grams = {g: np.array(ids, dtype=np.int32) for g, ids in token_grams.items()}
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    def _containing(self, token: str) -> "np.ndarray":
+        """Boolean mask of the filenames containing token as a substring"""
+        found = np.zeros(len(self.filenames), dtype=bool)
+        if len(token) <= 3:
+            matched = self._token_grams.get(token)
+            if matched is None:
+                return found
+        else:
+            candidates = None
+            for trigram in sorted({token[i:i + 3] for i in range(len(token) - 2)},
+                                  key=lambda t: len(self._token_grams.get(t, ()))):
+                ids = self._token_grams.get(trigram)
+                if ids is None:
+                    return found
+                candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+            matched = np.array([i for i in candidates if token in self._tokens[i]], dtype=np.int32)
+        starts = self._token_offsets[matched]
+        counts = self._token_offsets[matched + 1] - starts
+        positions = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        found[self._token_files[positions]] = True
+        return found
+
+    def scores(self, query: str) -> "np.ndarray":
+        size = len(self.filenames)
+        normalized = " ".join(query.lower().split())
+        if size == 0 or not normalized:
+            return np.zeros(size, dtype=np.float32)
+
+        query_trigrams = filename_trigrams(normalized)
+        matched = [self._postings[t] for t in query_trigrams if t in self._postings]
+        shared = np.bincount(np.concatenate(matched), minlength=size) if matched else np.zeros(size)
+        dice = 2.0 * shared / (len(query_trigrams) + self._trigram_counts)
+
+        tokens = filename_tokens(normalized)
+        containment = np.zeros(size, dtype=np.float32)
+        for token in tokens:
+            containment += self._containing(token)
+        if tokens:
+            containment /= len(tokens)
+
+        scores = FILENAME_TOKEN_WEIGHT * containment + (1.0 - FILENAME_TOKEN_WEIGHT) * dice
+        scores[self._exact.get(normalized, [])] = 1.0
+        return scores
+
+    def search(self, query: str, limit: int, min_score: float = 0.0) -> List[FilenameMatch]:
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores >= max(min_score, 1e-9))
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        ranked = sorted(candidates, key=lambda i: (-scores[i], self.filenames[i]))
+        return [{"filename": self.filenames[i], "score": round(float(scores[i]), 4)} for i in ranked]
+
+
+class FilenameCatalogRegistry:
+    """
+    Filename catalogs per (endpoint, collection).
+
+    The first request builds a catalog from the facet API (full scroll when
+    faceting is unavailable). Catalogs older than ttl keep being served while a
+    background task refreshes them; the refresh only rebuilds when the
+    collection's point count changed since the last build. Indexes are built in
+    a worker thread, and at most max_catalogs catalogs are kept (LRU).
+    """
+
+    def __init__(self, ttl: float, max_files: int, max_catalogs: int):
+        self.ttl = ttl
+        self.max_files = max_files
+        self.max_catalogs = max_catalogs
+        self._catalogs: "OrderedDict[tuple, FilenameCatalog]" = OrderedDict()
+        self._tasks: Dict[tuple, "asyncio.Task"] = {}
+        self.builds = 0
+        self.refreshes = 0
+        self.unchanged_refreshes = 0
+        self.evictions = 0
+
+    async def get(self, key: tuple, client, collection_name: str,
+                  retain=None, release=None) -> FilenameCatalog:
+        """
+        Return the catalog for key, building it on first use.
+
+        retain/release are called around a background refresh so the client
+        stays open while the refresh runs after the request has finished.
+        """
+        catalog = self._catalogs.get(key)
+        if catalog is None:
+            task = self._tasks.get(key)
+            if task is None:
+                task = self._start(key, client, collection_name, None)
+            return await asyncio.shield(task)
+
+        self._catalogs.move_to_end(key)
+        if time.monotonic() - catalog.built_at > self.ttl and key not in self._tasks:
+            if retain:
+                retain()
+            task = self._start(key, client, collection_name, catalog)
+            if release:
+                task.add_done_callback(lambda _: release())
+        return catalog
+
+    def _start(self, key: tuple, client, collection_name: str,
+               previous: Optional[FilenameCatalog]) -> "asyncio.Task":
+        task = asyncio.get_running_loop().create_task(self._refresh(key, client, collection_name, previous))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return task
+
+    async def _refresh(self, key: tuple, client, collection_name: str,
+                       previous: Optional[FilenameCatalog]) -> FilenameCatalog:
+        try:
+            points_count = (await client.get_collection(collection_name)).points_count
+            if previous is not None and points_count == previous.points_count:
+                previous.built_at = time.monotonic()
+                self.unchanged_refreshes += 1
+                return previous
+
+            filenames = await self._load_filenames(client, collection_name)
+            # Building the trigram index of a large catalog takes seconds of CPU
+            catalog = await asyncio.to_thread(FilenameCatalog, filenames, points_count)
+            self._store(key, catalog)
+            if previous is None:
+                self.builds += 1
+            else:
+                self.refreshes += 1
+            logger.info(f"Filename catalog for '{collection_name}' holds {len(catalog)} files")
+            return catalog
+        except Exception as e:
+            if previous is None:
+                raise
+            logger.error(f"Filename catalog refresh failed for '{collection_name}': {str(e)}")
+            return previous
+
+    def _store(self, key: tuple, catalog: FilenameCatalog):
+        self._catalogs[key] = catalog
+        self._catalogs.move_to_end(key)
+        while len(self._catalogs) > self.max_catalogs:
+            self._catalogs.popitem(last=False)
+            self.evictions += 1
+
+    async def _load_filenames(self, client, collection_name: str) -> List[str]:
+        try:
+            response = await client.facet(
+                collection_name=collection_name,
+                key="metadata.filename",
+                limit=self.max_files
+            )
+            return [hit.value for hit in response.hits if isinstance(hit.value, str)]
+        except Exception as e:
+            logger.warning(f"Facet on metadata.filename unavailable, scrolling '{collection_name}': {str(e)}")
+
+        filenames, offset = set(), None
+        while True:
+            points, offset = await client.scroll(
+                collection_name=collection_name,
+                with_payload=["metadata.filename"],
+                limit=1000,
+                offset=offset
+            )
+            for point in points:
+                filename = (point.payload or {}).get("metadata", {}).get("filename")
+                if isinstance(filename, str):
+                    filenames.add(filename)
+            if offset is None or len(filenames) >= self.max_files:
+                return list(filenames)
+
+    def invalidate(self, predicate=None) -> int:
+        keys = [key for key in self._catalogs if predicate is None or predicate(key)]
+        for key in keys:
+            del self._catalogs[key]
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "catalogs": len(self._catalogs),
+            "max_catalogs": self.max_catalogs,
+            "filenames": sum(len(c) for c in self._catalogs.values()),
+            "ttl_seconds": self.ttl,
+            "builds": self.builds,
+            "refreshes": self.refreshes,
+            "unchanged_refreshes": self.unchanged_refreshes,
+            "evictions": self.evictions
+        }
+
+
+def page_cache_weight(pages: tuple) -> int:
+    """Approximate memory held by the cached (point_id, payload) pairs of one page"""
+    return 64 + sum(
+        256 + (len(payload["pagecontent"]) if isinstance(payload.get("pagecontent"), str) else 0)
+        for _, payload in pages
+    )
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent async computations of the same key.
+
+    The first caller of a key starts the computation as a task; callers arriving
+    while it runs await the same task instead of starting their own. The task is
+    shielded, so a cancelled caller does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Any, "asyncio.Task"] = {}
+        self.coalesced = 0
+
+    async def do(self, key, factory):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+
+def response_cache_weight(results: List[List[Dict]]) -> int:
+    """Approximate memory held by one cached /search response"""
+    return 64 + sum(
+        256 + len(result.get("combined_page") or "")
+        for query_results in results
+        for result in query_results
+    )
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query used for cache keys: NFC with collapsed whitespace"""
+    return " ".join(unicodedata.normalize("NFC", query).split())
+
+
+class EmbeddingStore:
+    """
+    Persistent query-embedding store shared by all worker processes on a host.
+
+    Vectors are stored as packed float32 blobs in a SQLite database in WAL mode,
+    keyed by (embedding model, SHA-256 of the normalized query). Readers in
+    different processes never block each other, and the store survives restarts
+    and deploys. Query texts themselves are not stored. Once the stored vectors
+    exceed max_bytes, the least recently used entries are evicted down to 90% of
+    the budget. SQLite errors are logged and counted, never raised: the store
+    only ever saves Ollama calls.
+    """
+
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS embeddings (
+            model TEXT NOT NULL,
+            text_hash BLOB NOT NULL,
+            vector BLOB NOT NULL,
+            last_used REAL NOT NULL,
+            UNIQUE (model, text_hash)
+        )""",
+        "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)",
+        "CREATE TABLE IF NOT EXISTS store_stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO store_stats (key, value) VALUES ('bytes', 0)",
+    )
+    # Seconds before a read refreshes an entry's last_used (avoids a write per hit)
+    TOUCH_INTERVAL = 3600
+    # Keys per SELECT, below SQLite's bound-parameter limit
+    CHUNK_SIZE = 500
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        for statement in self.SCHEMA:
+            db.execute(statement)
+        db.execute("COMMIT")
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; autocommit, with explicit transactions for writes"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def _hash(text: str) -> bytes:
+        return hashlib.sha256(text.encode()).digest()
+
+    def _count(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, List[float]]:
+        """Stored vectors of the given normalized texts"""
+        hashes = {self._hash(text): text for text in texts}
+        found, stale = {}, []
+        now = time.time()
+        try:
+            db = self._connection()
+            keys = list(hashes)
+            for start in range(0, len(keys), self.CHUNK_SIZE):
+                chunk = keys[start:start + self.CHUNK_SIZE]
+                rows = db.execute(
+                    f"SELECT text_hash, vector, last_used FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk]
+                ).fetchall()
+                for text_hash, blob, last_used in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[hashes[bytes(text_hash)]] = vector.tolist()
+                    if now - last_used > self.TOUCH_INTERVAL:
+                        stale.append((now, model, text_hash))
+            if stale:
+                db.executemany("UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?", stale)
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding store read failed: {str(e)}")
+            self._count(errors=1)
+            return {}
+        self._count(hits=len(found), misses=len(hashes) - len(found))
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]):
+        """Store vectors of normalized texts, evicting the least recently used over max_bytes"""
+        now = time.time()
+        rows = [(model, self._hash(text), array("f", vector).tobytes(), now) for text, vector in vectors.items()]
+        try:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                added = written = 0
+                for row in rows:
+                    if db.execute(
+                        "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                        row
+                    ).rowcount:
+                        added += len(row[2])
+                        written += 1
+                db.execute("UPDATE store_stats SET value = value + ? WHERE key = 'bytes'", (added,))
+                total = db.execute("SELECT value FROM store_stats WHERE key = 'bytes'").fetchone()[0]
+                evicted = self._evict(db, total) if total > self.max_bytes else 0
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding store write failed: {str(e)}")
+            self._count(errors=1)
+            return
+        self._count(writes=written, evictions=evicted)
+
+    def _evict(self, db: sqlite3.Connection, total: int) -> int:
+        """Delete the least recently used entries until the store is at 90% of max_bytes"""
+        excess = total - int(self.max_bytes * 0.9)
+        doomed, freed = [], 0
+        cursor = db.execute("SELECT rowid, length(vector) FROM embeddings ORDER BY last_used")
+        for row_id, size in cursor:
+            if freed >= excess:
+                break
+            doomed.append((row_id,))
+            freed += size
+        cursor.close()
+        db.executemany("DELETE FROM embeddings WHERE rowid = ?", doomed)
+        db.execute("UPDATE store_stats SET value = value - ? WHERE key = 'bytes'", (freed,))
+        return len(doomed)
+
+    def warm(self, limit: int) -> int:
+        """Read the most recently used vectors so the first lookups hit the OS page cache"""
+        if limit <= 0:
+            return 0
+        try:
+            return sum(1 for _ in self._connection().execute(
+                "SELECT vector FROM embeddings ORDER BY last_used DESC LIMIT ?", (limit,)
+            ))
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding store warmup failed: {str(e)}")
+            self._count(errors=1)
+            return 0
+
+    def clear(self) -> int:
+        """Delete every stored vector; returns the number of entries removed"""
+        try:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                removed = db.execute("DELETE FROM embeddings").rowcount
+                db.execute("UPDATE store_stats SET value = 0 WHERE key = 'bytes'")
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding store clear failed: {str(e)}")
+            self._count(errors=1)
+            return 0
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            db = self._connection()
+            entries = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            stored = db.execute("SELECT value FROM store_stats WHERE key = 'bytes'").fetchone()[0]
+        except sqlite3.Error:
+            entries = stored = None
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": stored,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def open_embedding_store(path: str, max_bytes: int) -> Optional[EmbeddingStore]:
+    """Open (creating if needed) the persistent embedding store; None when disabled or unusable"""
+    if not path:
+        return None
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        store = EmbeddingStore(path, max_bytes)
+    except (OSError, sqlite3.Error) as e:
+        logger.error(f"Embedding store disabled, cannot open {path}: {str(e)}")
+        return None
+    logger.info("Embedding store opened", extra={"path": path, "max_bytes": max_bytes})
+    return store
+# ===============================
+
+# ======== Micro-batching ========
+class QueryMicroBatcher:
+    """
+    Merge the queries of concurrent searches into shared query_batch_points calls.
+
+    The first submission for a key opens a batch that is flushed after `window`
+    seconds or as soon as it holds max_batch queries. The flush embeds all of the
+    batch's queries at once, issues one query_batch_points call through the
+    opening system's client and hands each caller the responses for its own
+    queries. A failure is raised in every caller of the batch.
+    """
+
+    def __init__(self, window: float, max_batch: int):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[tuple, Dict[str, Any]] = {}
+        self._running: set = set()
+        self.batches = 0
+        self.submissions = 0
+        self.queries = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    async def submit(self, key: tuple, system: "AsyncSearchSystem", queries: List[str],
+                     query_params: Dict[str, Any], embedding_model: str) -> List[Any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = {"system": system, "embedding_model": embedding_model, "entries": [], "size": 0}
+            batch["timer"] = loop.call_later(self.window, self._flush, key, batch)
+            self._pending[key] = batch
+        batch["entries"].append((queries, query_params, future))
+        batch["size"] += len(queries)
+        if batch["size"] >= self.max_batch:
+            batch["timer"].cancel()
+            self._flush(key, batch)
+        return await future
+
+    def _flush(self, key: tuple, batch: Dict[str, Any]):
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: Dict[str, Any]):
+        entries = batch["entries"]
+        self.batches += 1
+        self.submissions += len(entries)
+        self.queries += batch["size"]
+        try:
+            responses = await batch["system"]._run_query_batch(
+                [query for queries, _, _ in entries for query in queries],
+                [query_params for queries, query_params, _ in entries for _ in queries],
+                batch["embedding_model"]
+            )
+        except Exception as e:
+            for _, _, future in entries:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        offset = 0
+        for queries, _, future in entries:
+            if not future.done():
+                future.set_result(responses[offset:offset + len(queries)])
+            offset += len(queries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "submissions": self.submissions,
+            "queries": self.queries,
+            "avg_batch_queries": round(self.queries / self.batches, 2) if self.batches else 0.0,
+            "pending": len(self._pending)
+        }
 # ===============================
 
 class SearchSystem:
-    _qdrant_pool_dev = None
-    _qdrant_pool_prod = None
-    _ollama_pool = None
+    """
+    Per-request search settings plus the process-wide caches and the pure helpers
+    of the search pipeline (filters, query requests, context windows, result
+    formatting). It does no I/O itself: AsyncSearchSystem owns the Qdrant and
+    Ollama clients and every network call.
+    """
+    # Shared by every AsyncSearchSystem instance in the process
+    _embedding_cache = TTLCache(EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL)
+    # Second level below _embedding_cache, shared across processes and restarts
+    _embedding_store = open_embedding_store(EMBEDDING_STORE_PATH, EMBEDDING_STORE_MAX_BYTES)
+    # Flipped off the first time Ollama rejects list-input /api/embed
+    _batch_embed_supported = OLLAMA_BATCH_EMBED
+    _page_cache = TTLCache(None, PAGE_CACHE_TTL, max_weight=PAGE_CACHE_MAX_BYTES, weigher=page_cache_weight)
+    # Collections known to exist, keyed by (endpoint, collection)
+    _collection_cache = TTLCache(1024, COLLECTION_CACHE_TTL)
+    # Built models.Filter objects: request filters by canonical JSON, context filters by (filename, ranges)
+    _filter_cache = TTLCache(FILTER_CACHE_SIZE, 0)
+    _context_filter_cache = TTLCache(FILTER_CACHE_SIZE, 0)
+    # Named vectors of each collection (empty for a single unnamed vector), keyed by (endpoint, collection)
+    _collection_vectors = TTLCache(1024, COLLECTION_CACHE_TTL)
+    # "pages" or "generic" as seen in search hits, keyed by (endpoint, collection)
+    _collection_layouts = TTLCache(1024, COLLECTION_CACHE_TTL)
+    # Payload fields read by each stage; see _search_payload_selector
+    PAGE_HIT_FIELDS = ["metadata.filename", "metadata.page_number"]
+    GENERIC_HIT_FIELDS = ["source", "pagecontent", "metadata"]
+    CONTEXT_PAGE_FIELDS = ["pagecontent", "metadata.filename", "metadata.page_number"]
+    COARSE_QUANTIZATION_CONFIGS = {
+        "none": None,
+        "scalar": models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, always_ram=True)
+        ),
+        "binary": models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True)),
+    }
+    # Endpoint identity of the pooled dev/prod clients, keyed by use_production
+    _pooled_endpoints: Dict[bool, str] = {}
 
     def __init__(self, collection_name: str, use_production: bool = False,
                  qdrant_url: Optional[str] = None, 
                  qdrant_api_key: Optional[str] = None, 
                  qdrant_verify_ssl: Optional[bool] = None,
-                 context_window_size: Optional[int] = None):
+                 context_window_size: Optional[int] = None,
+                 payload_include: Optional[List[str]] = None,
+                 payload_exclude: Optional[List[str]] = None,
+                 search_tuning: Optional[Dict[str, Any]] = None):
         self.collection_name = collection_name
         self.context_window_size = context_window_size if context_window_size is not None else CONTEXT_WINDOW_SIZE
+        self.payload_include = payload_include
+        self.payload_exclude = payload_exclude
+        self.search_params = self._search_params(search_tuning)
+        self.two_stage = (search_tuning or {}).get("two_stage", TWO_STAGE_SEARCH)
+        self.prefetch_oversampling = (search_tuning or {}).get("prefetch_oversampling", PREFETCH_OVERSAMPLING)
         self.use_custom_client = any([qdrant_url, qdrant_api_key, qdrant_verify_ssl is not None])
-        
+
         # Validate: cannot use both use_production flag and custom parameters
         if self.use_custom_client and use_production:
             raise ValueError("Cannot use both use_production flag and custom Qdrant parameters")
-        
-        if self.use_custom_client:
-            # Create custom client for this request (ignore use_production)
-            self.qclient = self._create_qdrant_client(
-                qdrant_url, qdrant_api_key, qdrant_verify_ssl, use_production=False, is_pooled=False
-            )
-            self.custom_client = True
-        else:
-            # Use pooled client (dev or prod based on use_production flag)
-            self.qclient = self._get_qdrant_client(use_production)
-            self.custom_client = False
-        
-        self.oclient = self._get_ollama_client()
-        self._ensure_collection()
-
-    def __del__(self):
-        """Close custom client when instance is destroyed"""
-        if self.custom_client and hasattr(self, 'qclient'):
-            try:
-                self.qclient.close()
-            except:
-                pass
+        self.qdrant_endpoint = self._get_endpoint_id(use_production, qdrant_url, qdrant_api_key, qdrant_verify_ssl)
 
     @staticmethod
-    def _create_qdrant_client(qdrant_url: Optional[str] = None,
-                             qdrant_api_key: Optional[str] = None,
-                             qdrant_verify_ssl: Optional[bool] = None,
-                             use_production: bool = False,
-                             is_pooled: bool = False) -> QdrantClient:
+    def _resolve_qdrant_params(qdrant_url: Optional[str] = None,
+                               qdrant_api_key: Optional[str] = None,
+                               qdrant_verify_ssl: Optional[bool] = None,
+                               use_production: bool = False,
+                               is_pooled: bool = False,
+                               is_async: bool = False,
+                               log: bool = True) -> Dict[str, Any]:
         """
-        Create a Qdrant client with configuration priority:
+        Resolve Qdrant client parameters with configuration priority:
         1. Request parameters (qdrant_url, qdrant_api_key, qdrant_verify_ssl)
         2. Environment-specific variables (DEV_* or PROD_* based on use_production)
         3. Generic environment variables (QDRANT_URL, QDRANT_API_KEY, QDRANT_VERIFY_SSL)
@@ -302,11 +1498,15 @@ class SearchSystem:
         else:
             api_key_source = "none"
         
+        if not log:
+            return client_params
+
         # Log connection details (without API key)
         logger.info(
             "Initializing Qdrant connection",
             extra={
                 "connection_type": "pooled" if is_pooled else "custom",
+                "async_client": is_async,
                 "environment_mode": env_name,
                 "protocol": protocol,
                 "host": host,
@@ -323,49 +1523,190 @@ class SearchSystem:
             }
         )
         
-        return QdrantClient(**client_params)
+        return client_params
 
-    @classmethod
-    def _get_qdrant_client(cls, use_production: bool = False):
-        """Get pooled Qdrant client using environment configuration"""
-        pool_attr = '_qdrant_pool_prod' if use_production else '_qdrant_pool_dev'
-        
-        if getattr(cls, pool_attr) is None:
-            try:
-                client = cls._create_qdrant_client(
-                    qdrant_url=None,
-                    qdrant_api_key=None,
-                    qdrant_verify_ssl=None,
-                    use_production=use_production,
-                    is_pooled=True
-                )
-                setattr(cls, pool_attr, client)
-            except Exception as e:
-                logger.error(f"Qdrant connection failed: {str(e)}")
-                raise QdrantConnectionError("Database connection error")
-        
-        return getattr(cls, pool_attr)
+    @staticmethod
+    def _endpoint_id_from_params(client_params: Dict[str, Any]) -> str:
+        """
+        Stable identity of a Qdrant endpoint for client pool and cache keys.
+
+        The API key is only hashed, with the full digest: credentials that share a
+        URL must never share a client or each other's cached results.
+        """
+        scheme = "https" if client_params.get("https") else "http"
+        endpoint = f"{scheme}://{client_params['host']}:{client_params.get('port', 6333)}"
+        if client_params.get("api_key"):
+            endpoint += "#" + hashlib.sha256(client_params["api_key"].encode()).hexdigest()
+        return endpoint
 
     @classmethod
-    def _get_ollama_client(cls):
-        if cls._ollama_pool is None:
-            try:
-                cls._ollama_pool = ollama.Client(host=OLLAMA_HOST, timeout=10)
-            except Exception as e:
-                logger.error(f"Ollama connection failed: {str(e)}")
-                raise ConnectionError("Embedding service unavailable")
-        return cls._ollama_pool
+    def _get_endpoint_id(cls, use_production: bool = False,
+                         qdrant_url: Optional[str] = None,
+                         qdrant_api_key: Optional[str] = None,
+                         qdrant_verify_ssl: Optional[bool] = None) -> str:
+        if any([qdrant_url, qdrant_api_key, qdrant_verify_ssl is not None]):
+            return cls._endpoint_id_from_params(cls._resolve_qdrant_params(
+                qdrant_url, qdrant_api_key, qdrant_verify_ssl, use_production=False, log=False
+            ))
+        if use_production not in SearchSystem._pooled_endpoints:
+            SearchSystem._pooled_endpoints[use_production] = cls._endpoint_id_from_params(
+                cls._resolve_qdrant_params(use_production=use_production, is_pooled=True, log=False)
+            )
+        return SearchSystem._pooled_endpoints[use_production]
 
-    def _ensure_collection(self):
-        if not self.qclient.collection_exists(self.collection_name):
-            self.qclient.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=models.VectorParams(
-                    size=DEFAULT_VECTOR_SIZE,
-                    distance=models.Distance.COSINE
-                )
+    def _collection_known(self) -> bool:
+        return self._collection_cache.get((self.qdrant_endpoint, self.collection_name)) is not None
+
+    def _remember_collection(self):
+        self._collection_cache.set((self.qdrant_endpoint, self.collection_name), True)
+
+    def _forget_collection(self):
+        """Drop the memoized existence check, layout and vector names, e.g. after a failed search"""
+        key = (self.qdrant_endpoint, self.collection_name)
+        self._collection_cache.invalidate(lambda cached_key: cached_key == key)
+        self._collection_layouts.invalidate(lambda cached_key: cached_key == key)
+        self._collection_vectors.invalidate(lambda cached_key: cached_key == key)
+
+    def _search_payload_selector(self):
+        """
+        with_payload for the vector search stage.
+
+        Page hits only need their filename and page number, since their text comes
+        from the context fetch; generic hits need the fields _format_generic_result
+        reads. Until a collection's layout has been seen the generic fields are
+        requested. Caller include/exclude lists replace the projection but never
+        drop the fields that identify page hits.
+        """
+        if self.payload_include is not None:
+            exclude = set(self.payload_exclude or [])
+            return list(dict.fromkeys(
+                self.PAGE_HIT_FIELDS + [field for field in self.payload_include if field not in exclude]
+            ))
+        if self.payload_exclude is not None:
+            return models.PayloadSelectorExclude(exclude=[
+                field for field in self.payload_exclude
+                if not any(key == field or key.startswith(field + ".") for key in self.PAGE_HIT_FIELDS)
+            ])
+        if self._collection_layouts.get((self.qdrant_endpoint, self.collection_name)) == "pages":
+            return self.PAGE_HIT_FIELDS
+        return self.GENERIC_HIT_FIELDS
+
+    @staticmethod
+    def _search_params(tuning: Optional[Dict[str, Any]]) -> Optional[models.SearchParams]:
+        """models.SearchParams for resolved search tuning (None: collection defaults)"""
+        if not tuning or all(tuning.get(key) is None for key in ("hnsw_ef", "exact", "rescore", "oversampling")):
+            return None
+        quantization = None
+        if tuning.get("rescore") is not None or tuning.get("oversampling") is not None:
+            quantization = models.QuantizationSearchParams(
+                rescore=tuning.get("rescore"),
+                oversampling=tuning.get("oversampling")
             )
-            logger.info(f"Created collection '{self.collection_name}' with vector size {DEFAULT_VECTOR_SIZE}")
+        return models.SearchParams(
+            hnsw_ef=tuning.get("hnsw_ef"),
+            exact=tuning.get("exact") or False,
+            quantization=quantization
+        )
+
+    def _query_params(self, filter_: Optional[models.Filter], limit: Optional[int],
+                      vector_names: Optional[frozenset] = None) -> Dict[str, Any]:
+        """
+        QueryRequest arguments of one query, apart from the query vector.
+
+        vector_names are the collection's named vectors (see
+        _collection_vector_names). Two-stage queries carry a "coarse" entry of
+        (vector name, vector size, candidate count) that _query_request turns
+        into a prefetch; collections without the coarse vector are searched in
+        one stage. A null limit is resolved to Qdrant's default of 10 results
+        here, so the candidate count can be derived from it.
+        """
+        if limit is None:
+            limit = QDRANT_DEFAULT_LIMIT
+        query_params = {
+            "filter": filter_,
+            "limit": limit,
+            "with_payload": self._search_payload_selector(),
+            "params": self.search_params
+        }
+        if vector_names and DENSE_VECTOR_NAME in vector_names:
+            query_params["using"] = DENSE_VECTOR_NAME
+        if self.two_stage and vector_names and COARSE_VECTOR_NAME in vector_names:
+            query_params["coarse"] = (
+                COARSE_VECTOR_NAME, COARSE_VECTOR_SIZE, math.ceil(limit * self.prefetch_oversampling)
+            )
+        elif self.two_stage:
+            logger.debug(f"Collection '{self.collection_name}' has no coarse vector, searching in one stage")
+        return query_params
+
+    @staticmethod
+    def _query_request(embedding: List[float], query_params: Dict[str, Any]) -> models.QueryRequest:
+        """Build the QueryRequest of one embedded query from its _query_params"""
+        query_params = dict(query_params)
+        coarse = query_params.pop("coarse", None)
+        if coarse:
+            vector_name, size, candidates = coarse
+            # A shorter coarse vector is the Matryoshka prefix of the full embedding
+            query_params["prefetch"] = models.Prefetch(
+                query=embedding[:size] if size else embedding,
+                using=vector_name,
+                filter=query_params["filter"],
+                params=query_params["params"],
+                limit=candidates
+            )
+        return models.QueryRequest(query=embedding, **query_params)
+
+    def _check_projection(self, params: List[Dict[str, Any]], query_responses: List[Any]) -> List[int]:
+        """
+        Learn the collection layout from a query_batch_points response.
+
+        params holds the _query_params of each query. Returns the indexes of
+        queries that were projected for page hits but matched other points; they
+        have to be re-run with the generic fields.
+        """
+        layout, misses = None, []
+        for index, (query_params, query_response) in enumerate(zip(params, query_responses)):
+            if not query_response.points:
+                continue
+            if all(self._is_page_hit(point.payload or {}) for point in query_response.points):
+                layout = layout or "pages"
+                continue
+            layout = "generic"
+            if query_params["with_payload"] is self.PAGE_HIT_FIELDS:
+                misses.append(index)
+        if layout is not None:
+            self._collection_layouts.set((self.qdrant_endpoint, self.collection_name), layout)
+        return misses
+
+    def _missing_collection(self):
+        logger.error(f"Collection '{self.collection_name}' does not exist")
+        raise CollectionNotFoundError(f"Collection '{self.collection_name}' not found")
+
+    @classmethod
+    def _vectors_config(cls):
+        """
+        Vector layout of auto-created collections.
+
+        A single unnamed vector by default; with COARSE_VECTOR_NAME set, a
+        full-precision DENSE_VECTOR_NAME vector kept on disk (it is only read to
+        rescore candidates) plus the coarse vector with COARSE_QUANTIZATION.
+        """
+        dense = models.VectorParams(size=DEFAULT_VECTOR_SIZE, distance=models.Distance.COSINE)
+        if not COARSE_VECTOR_NAME:
+            return {DENSE_VECTOR_NAME: dense} if DENSE_VECTOR_NAME else dense
+        dense.on_disk = True
+        return {
+            DENSE_VECTOR_NAME: dense,
+            COARSE_VECTOR_NAME: models.VectorParams(
+                size=COARSE_VECTOR_SIZE or DEFAULT_VECTOR_SIZE,
+                distance=models.Distance.COSINE,
+                quantization_config=cls.COARSE_QUANTIZATION_CONFIGS[COARSE_QUANTIZATION]
+            )
+        }
+
+    @staticmethod
+    def _vector_names_from_info(collection_info) -> frozenset:
+        vectors = collection_info.config.params.vectors
+        return frozenset(vectors) if isinstance(vectors, dict) else frozenset()
 
     def _has_page_structure(self, payload: Dict) -> bool:
         """Check if payload has page-based structure (non-strict validation)"""
@@ -382,62 +1723,249 @@ class SearchSystem:
         except (KeyError, TypeError):
             return False
 
-    def _get_context_pages(self, filename: str, center_page_number: int) -> List[Dict]:
-        try:
-            window_size = self.context_window_size
-            page_range = models.Range(
-                gte=max(0, center_page_number - window_size),
-                lte=min(1000, center_page_number + window_size)
-            )
-            
-            logger.debug(f"Fetching context: file={filename}, center={center_page_number}, range={page_range.gte}-{page_range.lte}")
-            
-            # Calculate dynamic limit: 2 * window_size + 1 (center ± window)
-            # Max window_size=11 → 23 pages, supports larger context windows
-            max_pages = 2 * window_size + 1
-            
-            scroll_result = self.qclient.scroll(
-                collection_name=self.collection_name,
-                scroll_filter=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="metadata.filename",
-                            match=models.MatchText(text=filename)
-                        ),
-                        models.FieldCondition(
-                            key="metadata.page_number",
-                            range=page_range
-                        )
-                    ]
+    @staticmethod
+    def _context_window(filename: Any, center_page_number: Any, window_size: int) -> Optional[tuple]:
+        """
+        Page window fetched around a hit: (filename, gte, lte, max_pages).
+
+        Returns None when the payload cannot describe a window, in which case the
+        hit is returned without context pages.
+        """
+        if not isinstance(filename, str) or isinstance(center_page_number, bool) or \
+                not isinstance(center_page_number, (int, float)):
+            return None
+        # Calculate dynamic limit: 2 * window_size + 1 (center ± window)
+        # Max window_size=11 → 23 pages, supports larger context windows
+        return (
+            filename,
+            max(0, center_page_number - window_size),
+            min(1000, center_page_number + window_size),
+            2 * window_size + 1
+        )
+
+    @staticmethod
+    def _merge_page_ranges(ranges: List[tuple]) -> List[tuple]:
+        """Merge overlapping or adjacent (gte, lte) page ranges"""
+        merged = []
+        for gte, lte in sorted(ranges):
+            if merged and gte <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], lte))
+            else:
+                merged.append((gte, lte))
+        return merged
+
+    def _plan_context_windows(self, query_responses: List[Any],
+                              window_sizes: Optional[List[int]] = None) -> Dict[tuple, tuple]:
+        """
+        Collect the context window of every page hit in a query_batch_points response.
+
+        Returns {(query_index, point_index): window}; see _context_window.
+        """
+        windows = {}
+        for query_index, query_response in enumerate(query_responses):
+            window_size = window_sizes[query_index] if window_sizes else self.context_window_size
+            for point_index, scored_point in enumerate(query_response.points):
+                payload = scored_point.payload
+                if not self._is_page_hit(payload):
+                    continue
+                try:
+                    window = self._context_window(
+                        payload["metadata"]["filename"], payload["metadata"]["page_number"], window_size
+                    )
+                except (KeyError, TypeError):
+                    continue
+                if window is not None:
+                    windows[(query_index, point_index)] = window
+        return windows
+
+    @classmethod
+    def _ranges_by_file(cls, windows: Dict[tuple, tuple]) -> Dict[str, List[tuple]]:
+        """Merge the page ranges of all windows per filename"""
+        ranges = {}
+        for filename, gte, lte, _ in windows.values():
+            ranges.setdefault(filename, []).append((gte, lte))
+        return {filename: cls._merge_page_ranges(file_ranges) for filename, file_ranges in ranges.items()}
+
+    @classmethod
+    def _compiled_filter(cls, cache: TTLCache, kind: str, key: Any, build) -> Optional[models.Filter]:
+        """Memoize build() under key; a key of None compiles without caching"""
+        if key is not None:
+            compiled = cache.get(key)
+            if compiled is not None:
+                return compiled
+        start = time.perf_counter()
+        compiled = build()
+        FILTER_COMPILE_LATENCY.labels(kind).observe(time.perf_counter() - start)
+        if compiled is not None and key is not None:
+            cache.set(key, compiled)
+        return compiled
+
+    @classmethod
+    def _context_scroll_filter(cls, filename: str, ranges: List[tuple]) -> models.Filter:
+        return cls._compiled_filter(
+            cls._context_filter_cache, "context", (filename, tuple(ranges)),
+            lambda: cls._build_context_scroll_filter(filename, ranges)
+        )
+
+    @staticmethod
+    def _build_context_scroll_filter(filename: str, ranges: List[tuple]) -> models.Filter:
+        range_conditions = [
+            models.FieldCondition(key="metadata.page_number", range=models.Range(gte=gte, lte=lte))
+            for gte, lte in ranges
+        ]
+        return models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="metadata.filename",
+                    match=models.MatchText(text=filename)
                 ),
-                with_payload=True,
-                limit=max_pages
-            )
-            
-            points = scroll_result[0]
-            logger.debug(f"Retrieved {len(points)} points from scroll")
-            
-            valid_pages = [p.payload for p in points if self._has_page_structure(p.payload)]
-            logger.debug(f"Valid pages after filtering: {len(valid_pages)}")
-            
-            return sorted(valid_pages, key=lambda x: x["metadata"]["page_number"])
-        except Exception as e:
-            logger.error(f"Context retrieval failed for page {center_page_number}: {str(e)}")
-            return []
+                range_conditions[0] if len(range_conditions) == 1 else models.Filter(should=range_conditions)
+            ]
+        )
+
+    def _slice_window(self, file_pages: List[Dict], window: tuple) -> List[Dict]:
+        """
+        Cut one hit's context pages out of a file's coalesced fetch.
+
+        file_pages are in point-id order like a per-window scroll, so keeping the
+        first max_pages inside the window reproduces that scroll exactly.
+        """
+        _, gte, lte, max_pages = window
+        in_window = []
+        for payload in file_pages:
+            metadata = payload.get("metadata")
+            page_number = metadata.get("page_number") if isinstance(metadata, dict) else None
+            if isinstance(page_number, (int, float)) and not isinstance(page_number, bool) and gte <= page_number <= lte:
+                in_window.append(payload)
+                if len(in_window) >= max_pages:
+                    break
+        valid_pages = [p for p in in_window if self._has_page_structure(p)]
+        return sorted(valid_pages, key=lambda x: x["metadata"]["page_number"])
+
+    def _page_cache_key(self, filename: str, page_number: int) -> tuple:
+        return (self.qdrant_endpoint, self.collection_name, filename, page_number)
+
+    def _cached_file_pages(self, filename: str, ranges: List[tuple]):
+        """
+        Look up every page of the merged ranges in the page cache.
+
+        Returns ({page_number: payloads} for cached pages, merged ranges still to fetch).
+        """
+        cached, missing = {}, []
+        for gte, lte in ranges:
+            for page_number in range(math.ceil(gte), math.floor(lte) + 1):
+                pages = self._page_cache.get(self._page_cache_key(filename, page_number))
+                if pages is None:
+                    missing.append(page_number)
+                else:
+                    cached[page_number] = pages
+        return cached, self._merge_page_ranges([(p, p) for p in missing])
+
+    def _store_file_pages(self, filename: str, ranges: List[tuple], records: List[Any]) -> Dict[int, tuple]:
+        """Group fetched points by page and cache them, including pages with no points"""
+        grouped = {
+            page_number: []
+            for gte, lte in ranges for page_number in range(math.ceil(gte), math.floor(lte) + 1)
+        }
+        for record in records:
+            metadata = record.payload.get("metadata")
+            page_number = metadata.get("page_number") if isinstance(metadata, dict) else None
+            if isinstance(page_number, int) and page_number in grouped:
+                grouped[page_number].append((record.id, record.payload))
+        fetched = {}
+        for page_number, pages in grouped.items():
+            fetched[page_number] = tuple(pages)
+            self._page_cache.set(self._page_cache_key(filename, page_number), fetched[page_number])
+        return fetched
 
-    def _generate_query_embedding(self, query: str, embedding_model: str) -> List[float]:
+    @staticmethod
+    def _ordered_file_pages(cached: Dict[int, tuple], fetched: Dict[int, tuple]) -> List[Dict]:
+        """Payloads of all pages in point-id order (numeric ids sort before UUIDs, as in Qdrant)"""
+        points = [point for pages in (*cached.values(), *fetched.values()) for point in pages]
+        points.sort(key=lambda point: (isinstance(point[0], str), point[0]))
+        return [payload for _, payload in points]
+
+    @classmethod
+    def _get_cached_embedding(cls, query: str, embedding_model: str) -> Optional[List[float]]:
+        cached = cls._embedding_cache.get((embedding_model, query))
+        return cached.tolist() if cached is not None else None
+
+    @classmethod
+    def _cache_embedding(cls, query: str, embedding_model: str, embedding: List[float]):
+        # array('d') keeps exact values at a third of the memory of a list of floats
+        cls._embedding_cache.set((embedding_model, query), array("d", embedding))
+
+    @classmethod
+    def _load_stored_embeddings(cls, texts: List[str], embedding_model: str) -> Dict[str, List[float]]:
+        """Vectors of texts found in the persistent store, copied into the in-process cache"""
+        found = cls._embedding_store.get_many(embedding_model, texts)
+        for text, vector in found.items():
+            cls._cache_embedding(text, embedding_model, vector)
+        return found
+
+    @classmethod
+    def _lookup_embeddings(cls, queries: List[str], embedding_model: str):
+        """
+        Split queries into cached vectors and the distinct normalized texts still to embed.
+
+        Returns (normalized queries in input order, {normalized query: vector}, missing texts).
+        """
+        normalized = [normalize_query(q) for q in queries]
+        vectors = {}
+        for query in dict.fromkeys(normalized):
+            cached = cls._get_cached_embedding(query, embedding_model)
+            if cached is not None:
+                vectors[query] = cached
+        missing = [q for q in dict.fromkeys(normalized) if q not in vectors]
+        return normalized, vectors, missing
+
+    @classmethod
+    def _batch_embed_unsupported(cls, error: Exception) -> bool:
+        """
+        Detect Ollama servers that predate the list-input /api/embed endpoint.
+
+        Ollama also answers 404 for an unknown model; that is a per-request error
+        and must not turn off batched embedding for later requests.
+        """
+        if not isinstance(error, ollama.ResponseError) or error.status_code not in (404, 405, 501):
+            return False
+        if cls._model_not_found(error):
+            return False
+        SearchSystem._batch_embed_supported = False
+        logger.warning(f"Batched embedding unavailable, falling back to single calls: {str(error)}")
+        return True
+
+    @staticmethod
+    def _model_not_found(error: Exception) -> bool:
+        """Ollama's 404 for a model that is not pulled: 'model "x" not found, try pulling it first'"""
+        message = str(getattr(error, 'error', '') or '').lower()
+        return 'model' in message and 'not found' in message
+
+    @classmethod
+    def _build_filter_conditions(cls, filter_dict: Optional[Dict]) -> Optional[models.Filter]:
+        """
+        Compiled Qdrant filter for a request filter dictionary.
+
+        Filters are memoized by their canonical JSON, so repeated filters skip the
+        model construction. Invalid filters raise InvalidFilterError, which the
+        API turns into a 400 before any Qdrant call.
+        """
+        if not filter_dict:
+            return None
         try:
-            embedding = self.oclient.embeddings(
-                model=embedding_model,
-                prompt=query
-            )['embedding']
-            logger.debug(f"Generated embedding for query: {query[:50]}...")
-            return embedding
-        except Exception as e:
-            logger.error(f"Embedding generation failed: {str(e)}")
-            raise EmbeddingError("Failed to process query") from e
+            key = json.dumps(filter_dict, sort_keys=True)
+        except (TypeError, ValueError):
+            key = None
+        try:
+            return cls._compiled_filter(
+                cls._filter_cache, "request", key, lambda: cls._compile_filter(filter_dict)
+            )
+        except InvalidFilterError:
+            FILTERS_REJECTED.inc()
+            raise
 
-    def _build_filter_conditions(self, filter_dict: Optional[Dict]) -> Optional[models.Filter]:
+    @staticmethod
+    def _compile_filter(filter_dict: Dict) -> Optional[models.Filter]:
         """
         Build Qdrant filter from filter dictionary.
         
@@ -453,6 +1981,9 @@ class SearchSystem:
             
         Returns:
             Qdrant Filter object or None if no valid conditions
+
+        Raises:
+            InvalidFilterError: malformed conditions or an inverted gte/lte range
             
         Examples:
             >>> # Array text filter
@@ -541,10 +2072,13 @@ class SearchSystem:
                     if "lte" in condition:
                         range_params["lte"] = condition["lte"]
                     
-                    # Validate range makes sense
+                    # An inverted range can never match, so reject it instead of searching
                     if "gte" in range_params and "lte" in range_params:
                         if range_params["gte"] > range_params["lte"]:
-                            logger.warning(f"Invalid range on field {field_path}: gte ({range_params['gte']}) > lte ({range_params['lte']})")
+                            raise InvalidFilterError(
+                                f"Invalid range on field {field_path}: "
+                                f"gte ({range_params['gte']}) > lte ({range_params['lte']})"
+                            )
                     
                     must_conditions.append(
                         models.FieldCondition(
@@ -561,107 +2095,678 @@ class SearchSystem:
             
             return None
             
+        except InvalidFilterError:
+            raise
         except Exception as e:
             logger.error(f"Filter processing failed: {str(e)}", extra={
                 "filter": filter_dict,
                 "correlation_id": correlation_id.get()
             })
-            raise SearchException("Invalid filter configuration") from e
+            raise InvalidFilterError("Invalid filter configuration") from e
+
+    @staticmethod
+    def _is_page_hit(payload: Dict) -> bool:
+        """Detect collection type based on payload structure"""
+        return (
+            "metadata" in payload and
+            "filename" in payload.get("metadata", {}) and
+            "page_number" in payload.get("metadata", {})
+        )
+
+    @staticmethod
+    def _format_page_result(scored_point, context_pages: List[Dict], seen_pages: set) -> PageResult:
+        """Build a page-based result, skipping pages already returned for this query"""
+        payload = scored_point.payload
+        filename = payload["metadata"]["filename"]
+
+        # Deduplicate: filter out pages already seen in previous results
+        unique_pages = []
+        for page in context_pages:
+            page_id = (filename, page["metadata"]["page_number"])
+            if page_id not in seen_pages:
+                unique_pages.append(page)
+                seen_pages.add(page_id)
+
+        page_numbers = [p["metadata"]["page_number"] for p in unique_pages]
+        return {
+            "filename": filename,
+            "score": scored_point.score,
+            "center_page": payload["metadata"]["page_number"],
+            "combined_page": " ".join(p.get("pagecontent", "") for p in unique_pages),
+            "page_numbers": page_numbers
+        }
+
+    @staticmethod
+    def _format_generic_result(scored_point) -> GenericResult:
+        """Build a result for generic/flexible collection structures (e.g., filenames)"""
+        payload = scored_point.payload
+        # Return clean, non-redundant fields
+        result: GenericResult = {
+            "score": scored_point.score
+        }
+
+        # Extract filename from source or pagecontent
+        if "source" in payload:
+            result["filename"] = payload["source"]
+        elif "pagecontent" in payload:
+            result["filename"] = payload["pagecontent"]
+
+        # Add metadata if present
+        if "metadata" in payload:
+            result["metadata"] = payload["metadata"]
+        return result
+
+    def _count_results(self, embedding_model: str, results: List[List[Dict]]):
+        SEARCH_RESULTS.labels(*metric_labels(self.collection_name, embedding_model)).inc(
+            sum(len(query_results) for query_results in results)
+        )
+
+    def _assemble_results(self, query_responses: List[Any], windows: Dict[tuple, tuple],
+                          pages_by_file: Dict[str, List[Dict]]) -> List[List[SearchResult]]:
+        """Turn query_batch_points responses plus fetched context pages into API results"""
+        results = []
+        for query_index, query_response in enumerate(query_responses):
+            query_results = []
+            seen_pages = set()  # Track (filename, page_number) to deduplicate across results
+
+            for point_index, scored_point in enumerate(query_response.points):
+                payload = scored_point.payload
+
+                if self._is_page_hit(payload):
+                    # Page-based content collection (e.g., "content")
+                    try:
+                        window = windows.get((query_index, point_index))
+                        context_pages = self._slice_window(pages_by_file.get(window[0], []), window) if window else []
+                        result = self._format_page_result(scored_point, context_pages, seen_pages)
+                    except (KeyError, TypeError) as e:
+                        logger.warning(f"Skipping malformed page-based payload: {str(e)}")
+                        continue
+                else:
+                    result = self._format_generic_result(scored_point)
+
+                query_results.append(result)
+            results.append(query_results)
+        return results
+
+class AsyncSearchSystem(SearchSystem):
+    """
+    Non-blocking SearchSystem built on AsyncQdrantClient and ollama.AsyncClient.
+
+    Every network call is awaited, so a single uvicorn worker can keep many
+    searches in flight instead of stalling its event loop on Ollama or Qdrant.
+    Collection validation is async, so build instances with ``await create(...)``
+    and release them with ``await close()``.
+    """
+    _async_qdrant_pool_dev = None
+    _async_qdrant_pool_prod = None
+    _async_ollama_pool = None
+    _custom_client_pool = QdrantClientPool(QDRANT_CLIENT_POOL_SIZE, QDRANT_CLIENT_IDLE_TIMEOUT)
+    _filename_catalogs = FilenameCatalogRegistry(
+        FILENAME_CATALOG_TTL, FILENAME_CATALOG_MAX_FILES, FILENAME_CATALOG_MAX_COLLECTIONS
+    )
+    # Complete /search responses, keyed by (endpoint, collection, request digest)
+    _response_cache = TTLCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL,
+                               max_weight=RESPONSE_CACHE_MAX_BYTES, weigher=response_cache_weight)
+    _inflight_searches = SingleFlight()
+    _query_batcher = QueryMicroBatcher(MICROBATCH_WINDOW_MS / 1000, MICROBATCH_MAX_BATCH)
+    # Embedding store writes still running; they only help later lookups, so searches don't wait
+    _store_writes: set = set()
+    # (endpoint id, verify) of the pooled dev/prod clients, keyed by use_production
+    _pooled_client_keys: Dict[bool, tuple] = {}
+
+    def __init__(self, collection_name: str, use_production: bool = False,
+                 qdrant_url: Optional[str] = None,
+                 qdrant_api_key: Optional[str] = None,
+                 qdrant_verify_ssl: Optional[bool] = None,
+                 context_window_size: Optional[int] = None,
+                 payload_include: Optional[List[str]] = None,
+                 payload_exclude: Optional[List[str]] = None,
+                 search_tuning: Optional[Dict[str, Any]] = None):
+        super().__init__(collection_name, use_production, qdrant_url, qdrant_api_key, qdrant_verify_ssl,
+                         context_window_size, payload_include, payload_exclude, search_tuning)
+        if self.use_custom_client:
+            self.qclient, self._client_key = self._acquire_custom_client(
+                qdrant_url, qdrant_api_key, qdrant_verify_ssl
+            )
+            self.custom_client = True
+        else:
+            self.qclient = self._get_async_qdrant_client(use_production)
+            self._client_key = self._pooled_client_key(use_production)
+            self.custom_client = False
+        # Context scrolls that failed; their hits are returned without context pages
+        self.context_failures = 0
+
+        self.oclient = self._get_async_ollama_client()
 
-    def batch_search(self, search_queries: List[str], filter: Optional[Dict], 
-                    limit: int = 5, embedding_model: str = "mxbai-embed-large") -> List[List[Dict]]:
+    @classmethod
+    async def create(cls, *args, **kwargs) -> "AsyncSearchSystem":
+        """Build a search system and make sure its collection is ready"""
+        system = cls(*args, **kwargs)
         try:
-            # Build filter conditions using the new helper method
-            filter_ = self._build_filter_conditions(filter)
+            await system._ensure_collection()
+        except Exception:
+            await system.close()
+            raise
+        return system
 
-            search_requests = []
-            for query in search_queries:
-                embedding = self._generate_query_embedding(query, embedding_model)
-                search_requests.append(
-                    models.QueryRequest(
-                        query=embedding,
-                        filter=filter_,
-                        limit=limit,
-                        with_payload=True
+    async def close(self):
+        """Hand the custom client back to the client pool; pooled clients stay open"""
+        if self.custom_client:
+            self._release_custom_client(self._client_key)
+            self.custom_client = False
+
+    @staticmethod
+    def _create_async_qdrant_client(qdrant_url: Optional[str] = None,
+                                   qdrant_api_key: Optional[str] = None,
+                                   qdrant_verify_ssl: Optional[bool] = None,
+                                   use_production: bool = False,
+                                   is_pooled: bool = False) -> AsyncQdrantClient:
+        """Create an async Qdrant client with a pool of QDRANT_POOL_SIZE gRPC channels"""
+        client_params = SearchSystem._resolve_qdrant_params(
+            qdrant_url, qdrant_api_key, qdrant_verify_ssl, use_production, is_pooled, is_async=True
+        )
+        return AsyncQdrantClient(pool_size=QDRANT_POOL_SIZE, **client_params)
+
+    @classmethod
+    def _acquire_custom_client(cls, qdrant_url: Optional[str] = None,
+                               qdrant_api_key: Optional[str] = None,
+                               qdrant_verify_ssl: Optional[bool] = None,
+                               use_production: bool = False):
+        """
+        Get a client for per-request connection overrides from the keyed client pool.
+
+        Returns (client, pool key); hand the key to _release_custom_client when done.
+        """
+        client_params = cls._resolve_qdrant_params(
+            qdrant_url, qdrant_api_key, qdrant_verify_ssl, use_production=use_production, log=False
+        )
+        key = (cls._endpoint_id_from_params(client_params), client_params.get("verify"))
+        client = cls._custom_client_pool.acquire(key, lambda: cls._create_async_qdrant_client(
+            qdrant_url, qdrant_api_key, qdrant_verify_ssl, use_production=use_production, is_pooled=False
+        ))
+        return client, key
+
+    @classmethod
+    def _pooled_client_key(cls, use_production: bool = False) -> tuple:
+        """Key of a pooled client in the form of custom client pool keys: (endpoint id, verify)"""
+        if use_production not in cls._pooled_client_keys:
+            client_params = cls._resolve_qdrant_params(use_production=use_production, is_pooled=True, log=False)
+            cls._pooled_client_keys[use_production] = (
+                cls._get_endpoint_id(use_production), client_params.get("verify")
+            )
+        return cls._pooled_client_keys[use_production]
+
+    @classmethod
+    def _release_custom_client(cls, key: tuple):
+        cls._custom_client_pool.release(key)
+
+    @classmethod
+    def _get_async_qdrant_client(cls, use_production: bool = False):
+        """Get pooled async Qdrant client using environment configuration"""
+        pool_attr = '_async_qdrant_pool_prod' if use_production else '_async_qdrant_pool_dev'
+
+        if getattr(cls, pool_attr) is None:
+            try:
+                client = cls._create_async_qdrant_client(
+                    qdrant_url=None,
+                    qdrant_api_key=None,
+                    qdrant_verify_ssl=None,
+                    use_production=use_production,
+                    is_pooled=True
+                )
+                setattr(cls, pool_attr, client)
+            except Exception as e:
+                logger.error(f"Qdrant connection failed: {str(e)}")
+                raise QdrantConnectionError("Database connection error")
+
+        return getattr(cls, pool_attr)
+
+    @classmethod
+    def _get_async_ollama_client(cls):
+        if cls._async_ollama_pool is None:
+            try:
+                cls._async_ollama_pool = ollama.AsyncClient(
+                    host=OLLAMA_HOST,
+                    timeout=10,
+                    limits=httpx.Limits(
+                        max_connections=OLLAMA_MAX_CONNECTIONS,
+                        max_keepalive_connections=OLLAMA_MAX_CONNECTIONS
                     )
                 )
+            except Exception as e:
+                logger.error(f"Ollama connection failed: {str(e)}")
+                raise ConnectionError("Embedding service unavailable")
+        return cls._async_ollama_pool
+
+    @classmethod
+    async def close_pools(cls):
+        """Close every pooled Qdrant and Ollama client, e.g. on shutdown"""
+        if cls._store_writes:
+            await asyncio.gather(*cls._store_writes, return_exceptions=True)
+        await cls._custom_client_pool.close_all()
+        for attr in ('_async_qdrant_pool_dev', '_async_qdrant_pool_prod', '_async_ollama_pool'):
+            client = getattr(cls, attr)
+            if client is None:
+                continue
+            setattr(cls, attr, None)
+            try:
+                await client.close()
+            except Exception as e:
+                logger.debug(f"Closing pooled client {attr} failed: {str(e)}")
 
-            batch_response = self.qclient.query_batch_points(
+    async def _ensure_collection(self):
+        if self._collection_known():
+            return
+        if not await self.qclient.collection_exists(self.collection_name):
+            if not AUTO_CREATE_COLLECTIONS:
+                self._missing_collection()
+            await self.qclient.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=self._vectors_config()
+            )
+            logger.info(f"Created collection '{self.collection_name}' with vector size {DEFAULT_VECTOR_SIZE}")
+        self._remember_collection()
+        METRIC_COLLECTIONS.add(self.collection_name)
+
+    async def _fetch_file_pages(self, filename: str, ranges: List[tuple]) -> List[Any]:
+        scroll_filter = self._context_scroll_filter(filename, ranges)
+        page_limit = sum(int(lte - gte) + 1 for gte, lte in ranges)
+        records, offset = [], None
+        while True:
+            points, offset = await self.qclient.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                with_payload=self.CONTEXT_PAGE_FIELDS,
+                limit=page_limit,
+                offset=offset
+            )
+            records.extend(points)
+            if offset is None:
+                return records
+
+    async def _fetch_context(self, windows: Dict[tuple, tuple], embedding_model: str) -> Dict[str, List[Dict]]:
+        """
+        Fetch all context pages missing from the page cache with one concurrent scroll per filename.
+
+        A failed scroll is logged and counted, and its hits keep no context pages.
+        """
+        cached_by_file, missing_by_file = {}, {}
+        for filename, ranges in self._ranges_by_file(windows).items():
+            cached_by_file[filename], missing = self._cached_file_pages(filename, ranges)
+            if missing:
+                missing_by_file[filename] = missing
+
+        responses = await asyncio.gather(
+            *(self._fetch_file_pages(filename, ranges) for filename, ranges in missing_by_file.items()),
+            return_exceptions=True
+        )
+        fetched_by_file = {}
+        for (filename, ranges), payloads in zip(missing_by_file.items(), responses):
+            if isinstance(payloads, Exception):
+                logger.error(f"Context retrieval failed for {filename}: {str(payloads)}")
+                BACKEND_ERRORS.labels("qdrant", *metric_labels(self.collection_name, embedding_model)).inc()
+                self.context_failures += 1
+                continue
+            CONTEXT_PAGES.labels(*metric_labels(self.collection_name, embedding_model)).inc(len(payloads))
+            fetched_by_file[filename] = self._store_file_pages(filename, ranges, payloads)
+
+        return {
+            filename: self._ordered_file_pages(cached, fetched_by_file.get(filename, {}))
+            for filename, cached in cached_by_file.items()
+        }
+
+    async def _collection_vector_names(self) -> Optional[frozenset]:
+        """Named vectors of the collection, looked up only when named vectors are configured"""
+        if not (COARSE_VECTOR_NAME or DENSE_VECTOR_NAME):
+            return None
+        key = (self.qdrant_endpoint, self.collection_name)
+        names = self._collection_vectors.get(key)
+        if names is None:
+            names = self._vector_names_from_info(await self.qclient.get_collection(self.collection_name))
+            self._collection_vectors.set(key, names)
+        return names
+
+    async def _embed_texts(self, texts: List[str], embedding_model: str) -> List[List[float]]:
+        """Embed texts with one /api/embed call per EMBED_BATCH_SIZE chunk, or concurrent single calls"""
+        chunks = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+        if SearchSystem._batch_embed_supported:
+            try:
+                responses = await asyncio.gather(*(
+                    self.oclient.embed(model=embedding_model, input=chunk, keep_alive=OLLAMA_KEEP_ALIVE) for chunk in chunks
+                ))
+                return [vector for response in responses for vector in response['embeddings']]
+            except Exception as e:
+                if not self._batch_embed_unsupported(e):
+                    raise
+
+        responses = await asyncio.gather(*(
+            self.oclient.embeddings(model=embedding_model, prompt=text, keep_alive=OLLAMA_KEEP_ALIVE) for text in texts
+        ))
+        return [response['embedding'] for response in responses]
+
+    @classmethod
+    def _store_embeddings(cls, embedding_model: str, vectors: Dict[str, List[float]]):
+        """Write vectors to the embedding store in a worker thread without waiting for SQLite's write lock"""
+        task = asyncio.ensure_future(asyncio.to_thread(cls._embedding_store.put_many, embedding_model, vectors))
+        cls._store_writes.add(task)
+        task.add_done_callback(cls._store_writes.discard)
+
+    async def _generate_query_embeddings(self, queries: List[str], embedding_model: str) -> List[List[float]]:
+        """Embed queries in input order; only cache and store misses are sent to Ollama, in one batch"""
+        normalized, vectors, missing = self._lookup_embeddings(queries, embedding_model)
+        if missing and self._embedding_store is not None:
+            # SQLite may wait on another process's write lock, so keep it off the event loop
+            vectors.update(await asyncio.to_thread(self._load_stored_embeddings, missing, embedding_model))
+            missing = [query for query in missing if query not in vectors]
+        if missing:
+            try:
+                embeddings = await self._embed_texts(missing, embedding_model)
+                if len(embeddings) != len(missing):
+                    raise EmbeddingError(f"Expected {len(missing)} embeddings, got {len(embeddings)}")
+            except Exception as e:
+                logger.error(f"Embedding generation failed: {str(e)}")
+                raise EmbeddingError("Failed to process query") from e
+            for query, embedding in zip(missing, embeddings):
+                vectors[query] = embedding
+                self._cache_embedding(query, embedding_model, embedding)
+            if self._embedding_store is not None:
+                self._store_embeddings(embedding_model, dict(zip(missing, embeddings)))
+            logger.debug(f"Generated {len(missing)} embeddings for {len(queries)} queries")
+        METRIC_MODELS.add(embedding_model)
+        return [vectors[query] for query in normalized]
+
+    async def _query_points(self, search_queries: List[str], filter: Optional[Dict],
+                            limit: int, embedding_model: str) -> List[Any]:
+        """Embed the queries and run them in one query_batch_points call (shared when micro-batching)"""
+        with observe_stage("filter", self.collection_name, embedding_model):
+            filter_ = self._build_filter_conditions(filter)
+
+        query_params = self._query_params(filter_, limit, await self._collection_vector_names())
+        if self._query_batcher.enabled:
+            # Batches run over the opener's client, so they are keyed by its client key:
+            # the endpoint id leaves out verify_ssl
+            with server_timing("microbatch"):
+                return await self._query_batcher.submit(
+                    (self._client_key, self.collection_name, embedding_model),
+                    self, search_queries, query_params, embedding_model
+                )
+        params = [query_params] * len(search_queries)
+        return await self._run_query_batch(search_queries, params, embedding_model)
+
+    async def _run_query_batch(self, queries: List[str], params: List[Dict[str, Any]],
+                               embedding_model: str) -> List[Any]:
+        """Embed queries and search them in one call; params holds the _query_params of each query"""
+        with observe_stage("embedding", self.collection_name, embedding_model):
+            embeddings = await self._generate_query_embeddings(queries, embedding_model)
+        search_requests = [
+            self._query_request(embedding, query_params)
+            for embedding, query_params in zip(embeddings, params)
+        ]
+
+        with observe_stage("vector_search", self.collection_name, embedding_model):
+            responses = await self.qclient.query_batch_points(
                 collection_name=self.collection_name,
                 requests=search_requests
             )
+            misses = self._check_projection(params, responses)
+            if misses:
+                for index in misses:
+                    search_requests[index].with_payload = self.GENERIC_HIT_FIELDS
+                retried = await self.qclient.query_batch_points(
+                    collection_name=self.collection_name,
+                    requests=[search_requests[index] for index in misses]
+                )
+                for index, query_response in zip(misses, retried):
+                    responses[index] = query_response
+            return responses
 
-            results = []
-            for query_response in batch_response:
-                query_results = []
-                seen_pages = set()  # Track (filename, page_number) to deduplicate across results
-                
-                for scored_point in query_response.points:
-                    payload = scored_point.payload
-                    
-                    # Detect collection type based on payload structure
-                    has_page_structure = (
-                        "metadata" in payload and
-                        "filename" in payload.get("metadata", {}) and
-                        "page_number" in payload.get("metadata", {})
-                    )
-                    
-                    if has_page_structure:
-                        # Page-based content collection (e.g., "content")
-                        try:
-                            context_pages = self._get_context_pages(
-                                filename=payload["metadata"]["filename"],
-                                center_page_number=payload["metadata"]["page_number"]
-                            )
-                            
-                            # Deduplicate: filter out pages already seen in previous results
-                            filename = payload["metadata"]["filename"]
-                            unique_pages = []
-                            for page in context_pages:
-                                page_id = (filename, page["metadata"]["page_number"])
-                                if page_id not in seen_pages:
-                                    unique_pages.append(page)
-                                    seen_pages.add(page_id)
-                            
-                            page_numbers = [p["metadata"]["page_number"] for p in unique_pages]
-                            result = {
-                                "filename": filename,
-                                "score": scored_point.score,
-                                "center_page": payload["metadata"]["page_number"],
-                                "combined_page": " ".join(p.get("pagecontent", "") for p in unique_pages),
-                                "page_numbers": page_numbers
-                            }
-                        except (KeyError, TypeError) as e:
-                            logger.warning(f"Skipping malformed page-based payload: {str(e)}")
-                            continue
-                    else:
-                        # Generic/flexible collection structure (e.g., filenames)
-                        # Return clean, non-redundant fields
-                        result = {
-                            "score": scored_point.score
-                        }
-                        
-                        # Extract filename from source or pagecontent
-                        if "source" in payload:
-                            result["filename"] = payload["source"]
-                        elif "pagecontent" in payload:
-                            result["filename"] = payload["pagecontent"]
-                        
-                        # Add metadata if present
-                        if "metadata" in payload:
-                            result["metadata"] = payload["metadata"]
-                    
-                    query_results.append(result)
-                results.append(query_results)
-            
+    async def batch_search(self, search_queries: List[str], filter: Optional[Dict],
+                           limit: int = 5, embedding_model: str = "mxbai-embed-large") -> List[List[Dict]]:
+        try:
+            batch_response = await self._query_points(search_queries, filter, limit, embedding_model)
+
+            with observe_stage("context", self.collection_name, embedding_model):
+                windows = self._plan_context_windows(batch_response)
+                pages_by_file = await self._fetch_context(windows, embedding_model)
+                results = self._assemble_results(batch_response, windows, pages_by_file)
+            self._count_results(embedding_model, results)
             return results
 
         except Exception as e:
             logger.error(f"Batch search failed: {str(e)}")
+            self._forget_collection()
             raise SearchException("Search operation failed") from e
 
+    async def batch_search_many(self, searches: List[Dict[str, Any]],
+                                embedding_model: str = "mxbai-embed-large") -> List[List[List[Dict]]]:
+        """
+        Run several searches with their own filter, limit and context window at once.
+
+        Each search is a dict with search_queries, filter, limit and
+        context_window_size (None: the system default). Distinct query texts are
+        embedded once and every query runs in a single query_batch_points call.
+        Returns one batch_search-style result list per search.
+        """
+        try:
+            queries, params, window_sizes = [], [], []
+            vector_names = await self._collection_vector_names()
+            for search in searches:
+                with observe_stage("filter", self.collection_name, embedding_model):
+                    filter_ = self._build_filter_conditions(search.get("filter"))
+                window_size = search.get("context_window_size")
+                if window_size is None:
+                    window_size = self.context_window_size
+                query_params = self._query_params(filter_, search["limit"], vector_names)
+                for query in search["search_queries"]:
+                    queries.append(query)
+                    params.append(query_params)
+                    window_sizes.append(window_size)
+
+            batch_response = await self._run_query_batch(queries, params, embedding_model)
+
+            with observe_stage("context", self.collection_name, embedding_model):
+                windows = self._plan_context_windows(batch_response, window_sizes)
+                pages_by_file = await self._fetch_context(windows, embedding_model)
+                results = self._assemble_results(batch_response, windows, pages_by_file)
+            self._count_results(embedding_model, results)
+
+            grouped, offset = [], 0
+            for search in searches:
+                grouped.append(results[offset:offset + len(search["search_queries"])])
+                offset += len(search["search_queries"])
+            return grouped
+
+        except Exception as e:
+            logger.error(f"Batch search failed: {str(e)}")
+            self._forget_collection()
+            raise SearchException("Search operation failed") from e
+
+    async def iter_search(self, search_queries: List[str], filter: Optional[Dict],
+                          limit: int = 5, embedding_model: str = "mxbai-embed-large"):
+        """
+        Streaming variant of batch_search.
+
+        Yields (query_index, results) as soon as each query's context pages are
+        assembled, so only one result set is held in memory at a time.
+        """
+        try:
+            batch_response = await self._query_points(search_queries, filter, limit, embedding_model)
+
+            for query_index, query_response in enumerate(batch_response):
+                with observe_stage("context", self.collection_name, embedding_model):
+                    windows = self._plan_context_windows([query_response])
+                    pages_by_file = await self._fetch_context(windows, embedding_model)
+                    results = self._assemble_results([query_response], windows, pages_by_file)
+                self._count_results(embedding_model, results)
+                yield query_index, results[0]
+
+        except Exception as e:
+            logger.error(f"Streaming search failed: {str(e)}")
+            self._forget_collection()
+            raise SearchException("Search operation failed") from e
+
+# ======== Startup Warmup ========
+def load_hot_queries(path: str) -> List[str]:
+    """Distinct non-empty lines of the hot query file, skipping "#" comments"""
+    if not path:
+        return []
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+    except OSError as e:
+        logger.error(f"Cannot read WARMUP_QUERIES_FILE {path}: {str(e)}")
+        return []
+    return list(dict.fromkeys(line for line in lines if line and not line.startswith("#")))
+
+
+class StartupWarmup:
+    """
+    Readiness of the process, driven by a background warmup started in the lifespan.
+
+    The warmup opens the pooled Qdrant clients of WARMUP_POOLS and the Ollama
+    client, retrying every WARMUP_RETRY_INTERVAL seconds until all of them
+    answer; the Ollama check embeds a short text, which loads the embedding
+    model. It then preloads the embedding store, filename catalogs and hot
+    queries for at most WARMUP_TIMEOUT seconds. Preload failures are logged
+    and do not keep the process unready. Liveness (/health) is not affected.
+    """
+
+    def __init__(self):
+        self.state = "starting"  # starting, warming, ready, stopping
+        self.checks: Dict[str, str] = {}
+        self.preload: Dict[str, Any] = {}
+        self.attempts = 0
+        self.elapsed_seconds: Optional[float] = None
+        self._task: Optional["asyncio.Task"] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self):
+        if not WARMUP_ENABLED:
+            self.state = "ready"
+            return
+        self.state = "warming"
+        self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        self.state = "stopping"
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def run(self):
+        start = time.perf_counter()
+        while not await self.check_connectivity():
+            logger.warning("Startup connectivity check failed, retrying", extra={"checks": self.checks})
+            await asyncio.sleep(WARMUP_RETRY_INTERVAL)
+        try:
+            await asyncio.wait_for(self.run_preload(), WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Startup preload did not finish within {WARMUP_TIMEOUT}s")
+            self.preload["timed_out"] = True
+        self.elapsed_seconds = round(time.perf_counter() - start, 3)
+        self.state = "ready"
+        logger.info("Startup warmup finished", extra={
+            "checks": self.checks,
+            "preload": self.preload,
+            "elapsed_ms": round(self.elapsed_seconds * 1000, 1)
+        })
+
+    async def check_connectivity(self) -> bool:
+        """Open the pooled clients and make one call through each; True when all answered"""
+        self.attempts += 1
+
+        async def check(name: str, call):
+            try:
+                await call()
+                self.checks[name] = "ok"
+            except Exception as e:
+                self.checks[name] = f"error: {str(e) or type(e).__name__}"
+
+        async def qdrant(use_production: bool):
+            client = AsyncSearchSystem._get_async_qdrant_client(use_production)
+            # One call per gRPC channel, so every channel of the pool is connected
+            await asyncio.gather(*(client.get_collections() for _ in range(QDRANT_POOL_SIZE)))
+
+        async def ollama_model():
+            await AsyncSearchSystem._get_async_ollama_client().embed(
+                model=DEFAULT_EMBEDDING_MODEL, input="warmup", keep_alive=OLLAMA_KEEP_ALIVE
+            )
+
+        await asyncio.gather(
+            *(check(f"qdrant_{pool}", lambda pool=pool: qdrant(pool == "prod")) for pool in WARMUP_POOLS),
+            check("ollama", ollama_model)
+        )
+        return all(result == "ok" for result in self.checks.values())
+
+    async def run_preload(self):
+        store = SearchSystem._embedding_store
+        if store is not None and EMBEDDING_STORE_WARM > 0:
+            self.preload["embedding_store_vectors"] = await asyncio.to_thread(store.warm, EMBEDDING_STORE_WARM)
+
+        targets = [(pool == "prod", collection) for pool in WARMUP_POOLS for collection in WARMUP_COLLECTIONS]
+        self.preload["filename_catalogs"] = 0
+        for use_production, collection in targets:
+            try:
+                await AsyncSearchSystem._filename_catalogs.get(
+                    (AsyncSearchSystem._get_endpoint_id(use_production), collection),
+                    AsyncSearchSystem._get_async_qdrant_client(use_production),
+                    collection
+                )
+                self.preload["filename_catalogs"] += 1
+            except Exception as e:
+                logger.warning(f"Filename catalog preload failed for '{collection}': {str(e)}")
+
+        queries = load_hot_queries(WARMUP_QUERIES_FILE)
+        semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+        self.preload.update(hot_queries=0, hot_query_errors=0)
+
+        async def search(use_production: bool, collection: str, query: str):
+            async with semaphore:
+                try:
+                    await cached_search(SearchRequest(
+                        collection_name=collection, search_queries=[query], use_production=use_production
+                    ))
+                    self.preload["hot_queries"] += 1
+                except Exception as e:
+                    self.preload["hot_query_errors"] += 1
+                    logger.debug(f"Hot query preload failed for '{collection}': {str(e)}")
+
+        await asyncio.gather(*(
+            search(use_production, collection, query) for use_production, collection in targets for query in queries
+        ))
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "status": self.state,
+            "checks": self.checks,
+            "attempts": self.attempts,
+            "preload": self.preload,
+            "elapsed_seconds": self.elapsed_seconds
+        }
+
+
+startup_warmup = StartupWarmup()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_warmup.start()
+    AsyncSearchSystem._custom_client_pool.start_sweeper()
+    try:
+        yield
+    finally:
+        await startup_warmup.stop()
+        await AsyncSearchSystem._custom_client_pool.stop_sweeper()
+        await AsyncSearchSystem.close_pools()
+# ===============================
+
 # ======== FastAPI Setup ========
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -669,6 +2774,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class SearchTuning(BaseModel):
+    hnsw_ef: Optional[conint(ge=1)] = Field(default=None, description="HNSW candidate list size: higher improves recall at the cost of latency")
+    exact: Optional[bool] = Field(default=None, description="Score every point instead of using the HNSW index")
+    rescore: Optional[bool] = Field(default=None, description="Rescore quantized candidates with the original vectors (quantization.rescore)")
+    oversampling: Optional[confloat(ge=1.0)] = Field(default=None, description="Fetch limit * oversampling quantized candidates before rescoring (quantization.oversampling)")
+    two_stage: Optional[bool] = Field(default=None, description="Prefetch candidates from the coarse vector and rescore them with the full vector (default: TWO_STAGE_SEARCH)")
+    prefetch_oversampling: Optional[confloat(ge=1.0)] = Field(default=None, description="Two-stage candidates per result (default: PREFETCH_OVERSAMPLING)")
+
 class SearchRequest(BaseModel):
     collection_name: str = Field(..., min_length=1, description="Name of the Qdrant collection")
     search_queries: List[str] = Field(..., min_items=1, description="List of search queries")
@@ -676,15 +2789,25 @@ class SearchRequest(BaseModel):
     embedding_model: Optional[str] = Field(default=DEFAULT_EMBEDDING_MODEL, description="Ollama embedding model name")
     limit: Optional[conint(ge=1)] = Field(default=5, description="Maximum number of results per query")
     context_window_size: Optional[conint(ge=0)] = Field(default=None, description="Number of pages before/after match to retrieve. Overrides CONTEXT_WINDOW_SIZE env var.")
+    payload_include: Optional[List[str]] = Field(default=None, description="Payload fields (e.g. metadata.title) to fetch for each hit; generic results return only these. Page results always carry filename and page numbers.")
+    payload_exclude: Optional[List[str]] = Field(default=None, description="Payload fields to leave out of each hit")
+    search_profile: Optional[Literal["default", "fast", "balanced", "accurate"]] = Field(default=None, description="Named HNSW/quantization preset (default: DEFAULT_SEARCH_PROFILE)")
+    search_params: Optional[SearchTuning] = Field(default=None, description="Raw hnsw_ef, exact, rescore and oversampling values; override the profile's")
     use_production: Optional[bool] = Field(default=False, description="Use production environment configuration (PROD_* variables)")
     qdrant_url: Optional[str] = Field(default=None, description="Override Qdrant URL for this request")
     qdrant_api_key: Optional[str] = Field(default=None, description="Override Qdrant API key for this request")
     qdrant_verify_ssl: Optional[bool] = Field(default=None, description="Override SSL verification for this request")
+    stream: Optional[Literal["ndjson", "sse"]] = Field(default=None, description="Stream each query's results as NDJSON lines or Server-Sent Events instead of one JSON body")
+    response_mode: Optional[Literal["full", "refs", "snippet"]] = Field(default="full", description="full: combined_page text; refs: filename and page numbers only; snippet: text around the best match with character offsets")
+    snippet_chars: Optional[conint(ge=50, le=20000)] = Field(default=None, description="Snippet length for response_mode=snippet (default: SNIPPET_CHARS)")
+    profile: Optional[bool] = Field(default=False, description="Return a sampled call-stack profile of this request (requires API key authentication)")
 
 @app.middleware("http")
 async def add_correlation_id(request: Request, call_next):
     corr_id = str(uuid.uuid4())
     correlation_id.set(corr_id)
+    timings = {}
+    stage_timings.set(timings)
     
     logger.info("Request started", extra={
         "path": request.url.path,
@@ -692,29 +2815,390 @@ async def add_correlation_id(request: Request, call_next):
         "client_ip": request.client.host if request.client else None
     })
     
+    start = time.perf_counter()
+    status_code = 500
     try:
         response = await call_next(request)
+        status_code = response.status_code
     except Exception as e:
         logger.error(f"Request failed: {str(e)}")
         raise
     finally:
         logger.info("Request completed")
+        # Label by route template so path parameters and unknown paths stay low-cardinality
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            request.method, route.path if route else "unmatched", status_code
+        ).observe(time.perf_counter() - start)
     
     response.headers["X-Correlation-ID"] = corr_id
+    response.headers["Server-Timing"] = format_server_timing(timings, time.perf_counter() - start)
     return response
 
 @app.get("/health")
 async def health_check(authenticated: bool = Depends(verify_api_key)):
+    """Liveness: the process serves requests; see /ready for warmup and connectivity"""
     return {
         "status": "ok",
         "services": {
-            "qdrant": "ok" if (SearchSystem._qdrant_pool_dev or SearchSystem._qdrant_pool_prod) else "offline",
-            "ollama": "ok" if SearchSystem._ollama_pool else "offline"
+            "qdrant": "ok" if (
+                AsyncSearchSystem._async_qdrant_pool_dev or AsyncSearchSystem._async_qdrant_pool_prod
+            ) else "offline",
+            "ollama": "ok" if AsyncSearchSystem._async_ollama_pool else "offline"
         }
     }
 
+@app.get("/ready")
+async def readiness_check(credentials: Optional[HTTPAuthorizationCredentials] = Security(security)):
+    """
+    Readiness: 200 once the startup warmup has finished, 503 before that and while shutting down.
+
+    Open without an API key, since load balancer health checks often cannot send
+    one; check and preload details are only returned to authenticated callers.
+    """
+    body = startup_warmup.status()
+    if API_KEY_ENABLED and (credentials is None or not API_KEY or credentials.credentials != API_KEY):
+        body = {"status": body["status"]}
+    return FastJSONResponse(
+        body,
+        status_code=status.HTTP_200_OK if startup_warmup.ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+@app.get("/metrics")
+async def metrics(authenticated: bool = Depends(verify_api_key)):
+    """Prometheus metrics: request and per-stage latency histograms, error and result counters"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/cache/stats")
+async def cache_stats(authenticated: bool = Depends(verify_api_key)):
+    """Hit/miss/eviction counters for the in-process caches"""
+    return {
+        "embedding": SearchSystem._embedding_cache.stats(),
+        "embedding_store": (
+            await asyncio.to_thread(SearchSystem._embedding_store.stats) if SearchSystem._embedding_store else None
+        ),
+        "pages": SearchSystem._page_cache.stats(),
+        "collections": SearchSystem._collection_cache.stats(),
+        "collection_layouts": SearchSystem._collection_layouts.stats(),
+        "filters": SearchSystem._filter_cache.stats(),
+        "context_filters": SearchSystem._context_filter_cache.stats(),
+        "qdrant_client_pool": AsyncSearchSystem._custom_client_pool.stats(),
+        "query_batches": AsyncSearchSystem._query_batcher.stats(),
+        "filename_catalogs": AsyncSearchSystem._filename_catalogs.stats(),
+        "responses": dict(
+            AsyncSearchSystem._response_cache.stats(),
+            coalesced=AsyncSearchSystem._inflight_searches.coalesced,
+            in_flight=len(AsyncSearchSystem._inflight_searches)
+        )
+    }
+
+class CacheInvalidateRequest(BaseModel):
+    collection_name: Optional[str] = Field(default=None, description="Only drop entries of this collection")
+    filename: Optional[str] = Field(default=None, description="Only drop cached pages of this filename")
+    caches: Optional[List[str]] = Field(default=None, description="Caches to invalidate (default: all data caches)")
+
+@app.post("/cache/invalidate")
+async def cache_invalidate(request: CacheInvalidateRequest, authenticated: bool = Depends(verify_api_key)):
+    """
+    Drop cached data after documents are re-ingested.
+    
+    Without filters every entry of the selected caches is removed. The embedding
+    cache and the persistent embedding store do not depend on collection data
+    and are only cleared when listed explicitly in `caches` ("embedding",
+    "embedding_store").
+    """
+    caches = set(request.caches or ["pages", "collections", "filenames", "responses"])
+    unknown = caches - {"pages", "collections", "filenames", "responses", "embedding", "embedding_store"}
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown caches: {sorted(unknown)}"
+        )
+
+    def matches_page(key):
+        _, collection, filename, _ = key
+        return (
+            (request.collection_name is None or collection == request.collection_name) and
+            (request.filename is None or filename == request.filename)
+        )
+
+    def matches_collection(key):
+        collection = key[1]
+        return request.collection_name is None or collection == request.collection_name
+
+    invalidated = {}
+    if "pages" in caches:
+        invalidated["pages"] = SearchSystem._page_cache.invalidate(matches_page)
+    # Existence checks are per collection, so a filename-scoped invalidation keeps them
+    if "collections" in caches and request.filename is None:
+        invalidated["collections"] = SearchSystem._collection_cache.invalidate(matches_collection)
+        SearchSystem._collection_layouts.invalidate(matches_collection)
+        SearchSystem._collection_vectors.invalidate(matches_collection)
+    # A re-ingested file may be new, so its collection's filename catalog is rebuilt too
+    if "filenames" in caches:
+        invalidated["filenames"] = AsyncSearchSystem._filename_catalogs.invalidate(matches_collection)
+    # Any cached response may include pages of the file, so drop the whole collection
+    if "responses" in caches:
+        invalidated["responses"] = AsyncSearchSystem._response_cache.invalidate(matches_collection)
+    if "embedding" in caches:
+        invalidated["embedding"] = SearchSystem._embedding_cache.invalidate()
+    if "embedding_store" in caches and SearchSystem._embedding_store is not None:
+        invalidated["embedding_store"] = await asyncio.to_thread(SearchSystem._embedding_store.clear)
+
+    logger.info("Caches invalidated", extra={
+        "collection": request.collection_name,
+        "document": request.filename,
+        "invalidated": invalidated
+    })
+    return {"invalidated": invalidated}
+
+def query_terms(query: str) -> List[str]:
+    return list(dict.fromkeys(term for term in re.findall(r"\w+", query.lower()) if len(term) > 1))
+
+def snippet_bounds(text: str, terms: List[str], size: int) -> tuple:
+    """
+    Character range of at most `size` characters around the best-matching region of text.
+
+    The region is the stretch of text containing the most distinct query terms
+    (then the most matches); without matches the text start is used. Bounds are
+    moved to word boundaries.
+    """
+    if len(text) <= size:
+        return 0, len(text)
+    matches = []
+    if terms:
+        pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, terms)) + ")", re.IGNORECASE)
+        matches = [(match.start(), match.end(), match.group(0).lower()) for match in pattern.finditer(text)]
+    if not matches:
+        start = 0
+    else:
+        best_score, best_span = None, None
+        counts: Dict[str, int] = {}
+        left = 0
+        for right, (_, end, term) in enumerate(matches):
+            counts[term] = counts.get(term, 0) + 1
+            while end - matches[left][0] > size:
+                left_term = matches[left][2]
+                counts[left_term] -= 1
+                if not counts[left_term]:
+                    del counts[left_term]
+                left += 1
+            score = (len(counts), right - left + 1)
+            if best_score is None or score > best_score:
+                best_score, best_span = score, (matches[left][0], end)
+        middle = (best_span[0] + best_span[1]) // 2
+        start = max(0, min(len(text) - size, middle - size // 2))
+    end = min(len(text), start + size)
+    if start > 0:
+        space = text.find(" ", start, start + 30)
+        if space != -1:
+            start = space + 1
+    if end < len(text):
+        space = text.rfind(" ", end - 30, end)
+        if space > start:
+            end = space
+    return start, end
+
+def shape_results(results: List[List[Dict]], queries: List[str], response_mode: str,
+                  snippet_chars: Optional[int] = None) -> List[List[Dict]]:
+    """
+    Apply response_mode to page-based results, one result list per query.
+
+    "refs" drops combined_page; "snippet" replaces it with the best-matching
+    passage and its [snippet_start, snippet_end) offsets in combined_page.
+    Results are copied, so cached result lists are never modified.
+    """
+    if response_mode == "full":
+        return results
+    size = snippet_chars or SNIPPET_CHARS
+    shaped = []
+    for query, query_results in zip(queries, results):
+        terms = query_terms(query) if response_mode == "snippet" else []
+        shaped_results = []
+        for result in query_results:
+            if "combined_page" not in result:
+                shaped_results.append(result)
+                continue
+            result = dict(result)
+            text = result.pop("combined_page")
+            if response_mode == "snippet":
+                start, end = snippet_bounds(text, terms, size)
+                result.update({
+                    "snippet": text[start:end],
+                    "snippet_start": start,
+                    "snippet_end": end,
+                    "text_length": len(text)
+                })
+            shaped_results.append(result)
+        shaped.append(shaped_results)
+    return shaped
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def format_stream_event(stream: str, event: str, data: Dict) -> bytes:
+    body = dumps_json(data)
+    if stream == "sse":
+        return b"event: " + event.encode() + b"\ndata: " + body + b"\n\n"
+    return body + b"\n"
+
+def resolve_search_tuning(profile: Optional[str], overrides: Optional[SearchTuning]) -> Dict[str, Any]:
+    """Settings of the search profile, with explicitly set search_params taking precedence"""
+    tuning = dict(SEARCH_PROFILES[profile or DEFAULT_SEARCH_PROFILE])
+    if overrides is not None:
+        for field in ("hnsw_ef", "exact", "rescore", "oversampling", "two_stage", "prefetch_oversampling"):
+            value = getattr(overrides, field)
+            if value is not None:
+                tuning[field] = value
+    return tuning
+
+def search_cache_key(search_request: SearchRequest) -> tuple:
+    """
+    Response cache key: (endpoint, collection, digest of the result-shaping fields).
+
+    The endpoint identity only carries a hash of the Qdrant API key, so no secret
+    ends up in the key. Defaults are resolved first so that omitted and explicit
+    default values share an entry.
+    """
+    endpoint = SearchSystem._get_endpoint_id(
+        search_request.use_production,
+        search_request.qdrant_url,
+        search_request.qdrant_api_key,
+        search_request.qdrant_verify_ssl
+    )
+    context_window_size = search_request.context_window_size
+    canonical = json.dumps({
+        "queries": search_request.search_queries,
+        "filter": search_request.filter,
+        "embedding_model": search_request.embedding_model,
+        "limit": search_request.limit,
+        "context_window_size": context_window_size if context_window_size is not None else CONTEXT_WINDOW_SIZE,
+        "payload_include": search_request.payload_include,
+        "payload_exclude": search_request.payload_exclude,
+        "search_tuning": resolve_search_tuning(search_request.search_profile, search_request.search_params),
+        "use_production": search_request.use_production,
+        "verify_ssl": search_request.qdrant_verify_ssl
+    }, sort_keys=True, default=str)
+    return endpoint, search_request.collection_name, hashlib.sha256(canonical.encode()).hexdigest()
+
+async def run_search(search_request: SearchRequest) -> tuple:
+    """
+    Run a non-streaming search.
+
+    Returns (results, complete); complete is False when context pages of some
+    hits could not be fetched, so the results must not be cached.
+    """
+    system = await AsyncSearchSystem.create(
+        collection_name=search_request.collection_name,
+        use_production=search_request.use_production,
+        qdrant_url=search_request.qdrant_url,
+        qdrant_api_key=search_request.qdrant_api_key,
+        qdrant_verify_ssl=search_request.qdrant_verify_ssl,
+        context_window_size=search_request.context_window_size,
+        payload_include=search_request.payload_include,
+        payload_exclude=search_request.payload_exclude,
+        search_tuning=resolve_search_tuning(search_request.search_profile, search_request.search_params)
+    )
+    try:
+        results = await system.batch_search(
+            search_queries=search_request.search_queries,
+            filter=search_request.filter,
+            limit=search_request.limit,
+            embedding_model=search_request.embedding_model
+        )
+        return results, system.context_failures == 0
+    finally:
+        await system.close()
+
+async def cached_search(search_request: SearchRequest) -> List[List[Dict]]:
+    """
+    Serve identical requests from the response cache.
+
+    Concurrent misses for the same key share a single run_search call. Results
+    with missing context pages are returned but not cached.
+    """
+    key = search_cache_key(search_request)
+    results = AsyncSearchSystem._response_cache.get(key)
+    if results is not None:
+        return results
+
+    async def compute():
+        results, complete = await run_search(search_request)
+        if complete:
+            AsyncSearchSystem._response_cache.set(key, results)
+        else:
+            logger.warning("Search response not cached: context retrieval failed",
+                           extra={"collection": search_request.collection_name})
+        return results
+
+    return await AsyncSearchSystem._inflight_searches.do(key, compute)
+
+async def stream_search_results(search_request: SearchRequest):
+    """
+    Emit one event per query as soon as its results are ready, then a final summary.
+    
+    NDJSON lines are {"query_index", "query", "results"}, then {"done": true, ...};
+    SSE uses the same payloads with "result" and "done" events. Failures after the
+    response has started are reported as a final "error" event.
+    
+    The search system is created by the generator itself, so a custom client is
+    only checked out once the body is iterated and always handed back by the
+    finally block, even when the client goes away before the first event.
+    """
+    stream = search_request.stream
+    result_count = 0
+    system = None
+    try:
+        system = await AsyncSearchSystem.create(
+            collection_name=search_request.collection_name,
+            use_production=search_request.use_production,
+            qdrant_url=search_request.qdrant_url,
+            qdrant_api_key=search_request.qdrant_api_key,
+            qdrant_verify_ssl=search_request.qdrant_verify_ssl,
+            context_window_size=search_request.context_window_size,
+            payload_include=search_request.payload_include,
+            payload_exclude=search_request.payload_exclude,
+            search_tuning=resolve_search_tuning(search_request.search_profile, search_request.search_params)
+        )
+        async for query_index, results in system.iter_search(
+            search_queries=search_request.search_queries,
+            filter=search_request.filter,
+            limit=search_request.limit,
+            embedding_model=search_request.embedding_model
+        ):
+            result_count += len(results)
+            query = search_request.search_queries[query_index]
+            yield format_stream_event(stream, "result", {
+                "query_index": query_index,
+                "query": query,
+                "results": shape_results(
+                    [results], [query], search_request.response_mode, search_request.snippet_chars
+                )[0]
+            })
+        yield format_stream_event(stream, "done", {"done": True, "result_count": result_count})
+    except (CollectionNotFoundError, ValueError) as e:
+        yield format_stream_event(stream, "error", {"error": str(e)})
+    except Exception as e:
+        logger.error(f"Search stream failed: {str(e)}")
+        yield format_stream_event(stream, "error", {"error": "Search processing failed"})
+    finally:
+        if system is not None:
+            await system.close()
+
 @app.post("/search", status_code=status.HTTP_200_OK)
 async def search(request: Request, search_request: SearchRequest, authenticated: bool = Depends(verify_api_key)):
+    if search_request.profile:
+        # Profiles expose code paths and timings, so they are never served anonymously
+        if not API_KEY_ENABLED:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Profiling requires API key authentication"
+            )
+        if search_request.stream:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="profile cannot be combined with stream"
+            )
+    
     try:
         # Log request with connection configuration
         logger.info("Search request received", extra={
@@ -728,27 +3212,42 @@ async def search(request: Request, search_request: SearchRequest, authenticated:
             ])
         })
         
-        # Create SearchSystem with connection parameters
-        system = SearchSystem(
-            collection_name=search_request.collection_name,
-            use_production=search_request.use_production,
-            qdrant_url=search_request.qdrant_url,
-            qdrant_api_key=search_request.qdrant_api_key,
-            qdrant_verify_ssl=search_request.qdrant_verify_ssl,
-            context_window_size=search_request.context_window_size
-        )
+        # Reject malformed filters before any Qdrant or Ollama call
+        SearchSystem._build_filter_conditions(search_request.filter)
         
-        results = system.batch_search(
-            search_queries=search_request.search_queries,
-            filter=search_request.filter,
-            limit=search_request.limit,
-            embedding_model=search_request.embedding_model
-        )
+        if search_request.stream:
+            # Streamed responses bypass the response cache. Connection settings are
+            # validated here, the stream checks out its client once it is iterated
+            SearchSystem(
+                collection_name=search_request.collection_name,
+                use_production=search_request.use_production,
+                qdrant_url=search_request.qdrant_url,
+                qdrant_api_key=search_request.qdrant_api_key,
+                qdrant_verify_ssl=search_request.qdrant_verify_ssl
+            )
+            return StreamingResponse(
+                stream_search_results(search_request),
+                media_type=STREAM_MEDIA_TYPES[search_request.stream],
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
+        if search_request.profile:
+            # Profiled requests always run the search instead of reusing a cached response
+            with StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000) as sampler:
+                results, _ = await run_search(search_request)
+            body = {"results": results, "profile": sampler.report()}
+        else:
+            results = await cached_search(search_request)
+            body = {"results": results}
         
         logger.debug("Search results generated", extra={
             "result_count": sum(len(r) for r in results)
         })
-        return {"results": results}
+        body["results"] = shape_results(
+            results, search_request.search_queries, search_request.response_mode, search_request.snippet_chars
+        )
+        with observe_stage("serialization", search_request.collection_name, search_request.embedding_model):
+            return FastJSONResponse(body)
     
     except ValueError as e:
         # Handle validation errors (e.g., conflicting parameters)
@@ -757,6 +3256,122 @@ async def search(request: Request, search_request: SearchRequest, authenticated:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except CollectionNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except InvalidFilterError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except SearchException as e:
+        logger.error(f"Search error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search processing failed"
+        )
+    except Exception as e:
+        logger.critical(f"Unexpected error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+class BatchSearchItem(BaseModel):
+    search_queries: List[str] = Field(..., min_items=1, description="Queries of this sub-request")
+    filter: Optional[Dict[str, Dict[str, Any]]] = Field(None, description="Filter conditions for this sub-request (same format as /search)")
+    limit: Optional[conint(ge=1)] = Field(default=5, description="Maximum number of results per query")
+    context_window_size: Optional[conint(ge=0)] = Field(default=None, description="Pages before/after each match (default: request-level context_window_size)")
+
+class BatchSearchRequest(BaseModel):
+    collection_name: str = Field(..., min_length=1, description="Name of the Qdrant collection")
+    searches: List[BatchSearchItem] = Field(..., min_items=1, description="Sub-requests, each with its own queries, filter, limit and context window")
+    embedding_model: Optional[str] = Field(default=DEFAULT_EMBEDDING_MODEL, description="Ollama embedding model name")
+    context_window_size: Optional[conint(ge=0)] = Field(default=None, description="Default context window for sub-requests. Overrides CONTEXT_WINDOW_SIZE env var.")
+    payload_include: Optional[List[str]] = Field(default=None, description="Payload fields to fetch for each hit (see /search)")
+    payload_exclude: Optional[List[str]] = Field(default=None, description="Payload fields to leave out of each hit (see /search)")
+    search_profile: Optional[Literal["default", "fast", "balanced", "accurate"]] = Field(default=None, description="Named HNSW/quantization preset (see /search)")
+    search_params: Optional[SearchTuning] = Field(default=None, description="Raw search parameters overriding the profile (see /search)")
+    response_mode: Optional[Literal["full", "refs", "snippet"]] = Field(default="full", description="full, refs or snippet (see /search)")
+    snippet_chars: Optional[conint(ge=50, le=20000)] = Field(default=None, description="Snippet length for response_mode=snippet (default: SNIPPET_CHARS)")
+    use_production: Optional[bool] = Field(default=False, description="Use production environment configuration (PROD_* variables)")
+    qdrant_url: Optional[str] = Field(default=None, description="Override Qdrant URL for this request")
+    qdrant_api_key: Optional[str] = Field(default=None, description="Override Qdrant API key for this request")
+    qdrant_verify_ssl: Optional[bool] = Field(default=None, description="Override SSL verification for this request")
+
+@app.post("/search/batch", status_code=status.HTTP_200_OK)
+async def search_batch(batch_request: BatchSearchRequest, authenticated: bool = Depends(verify_api_key)):
+    """
+    Run several searches with different filters, limits and context windows in one round trip.
+    
+    All distinct query texts are embedded once and every query runs in a single
+    Qdrant batch call. Results are returned per sub-request, each shaped like a
+    /search response.
+    """
+    try:
+        logger.info("Batch search request received", extra={
+            "collection": batch_request.collection_name,
+            "search_count": len(batch_request.searches),
+            "query_count": sum(len(search.search_queries) for search in batch_request.searches),
+            "use_production": batch_request.use_production
+        })
+        
+        for search in batch_request.searches:
+            SearchSystem._build_filter_conditions(search.filter)
+        
+        system = await AsyncSearchSystem.create(
+            collection_name=batch_request.collection_name,
+            use_production=batch_request.use_production,
+            qdrant_url=batch_request.qdrant_url,
+            qdrant_api_key=batch_request.qdrant_api_key,
+            qdrant_verify_ssl=batch_request.qdrant_verify_ssl,
+            context_window_size=batch_request.context_window_size,
+            payload_include=batch_request.payload_include,
+            payload_exclude=batch_request.payload_exclude,
+            search_tuning=resolve_search_tuning(batch_request.search_profile, batch_request.search_params)
+        )
+        try:
+            grouped = await system.batch_search_many(
+                searches=[
+                    {
+                        "search_queries": search.search_queries,
+                        "filter": search.filter,
+                        "limit": search.limit,
+                        "context_window_size": search.context_window_size
+                    }
+                    for search in batch_request.searches
+                ],
+                embedding_model=batch_request.embedding_model
+            )
+        finally:
+            await system.close()
+        
+        with observe_stage("serialization", batch_request.collection_name, batch_request.embedding_model):
+            return FastJSONResponse({"results": [
+                {"results": shape_results(
+                    results, search.search_queries, batch_request.response_mode, batch_request.snippet_chars
+                )}
+                for search, results in zip(batch_request.searches, grouped)
+            ]})
+    
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except CollectionNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except InvalidFilterError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except SearchException as e:
         logger.error(f"Search error: {str(e)}")
         raise HTTPException(
@@ -771,9 +3386,11 @@ async def search(request: Request, search_request: SearchRequest, authenticated:
         )
 
 class FilenameSearchRequest(BaseModel):
-    query: str = Field(..., min_length=1, description="Fuzzy search query for filename")
+    query: Optional[str] = Field(default=None, min_length=1, description="Fuzzy search query for filename")
+    queries: Optional[List[str]] = Field(default=None, min_items=1, description="Batch mode: several fuzzy queries answered in one call")
     collection_name: str = Field(..., min_length=1, description="Name of the Qdrant collection")
     limit: Optional[conint(ge=1, le=1000)] = Field(default=10, description="Maximum number of matching filenames to return")
+    min_score: Optional[confloat(ge=0.0, le=1.0)] = Field(default=None, description="Minimum fuzzy score (default: FILENAME_MIN_SCORE)")
     use_production: Optional[bool] = Field(default=False, description="Use production environment configuration")
     qdrant_url: Optional[str] = Field(default=None, description="Override Qdrant URL")
     qdrant_api_key: Optional[str] = Field(default=None, description="Override Qdrant API key")
@@ -783,69 +3400,82 @@ class FilenameSearchRequest(BaseModel):
 async def search_filenames(request: FilenameSearchRequest, authenticated: bool = Depends(verify_api_key)):
     """
     Fuzzy search on metadata.filename field and return matching filenames.
-    Does not return page content - only unique filenames that match the query.
+    Does not return page content - only unique filenames that match the query,
+    ranked by fuzzy score.
+    
+    Queries are answered from an in-memory catalog of the collection's distinct
+    filenames. Pass `queries` instead of `query` to rank several queries at once.
     
     Example: Searching "ecos 9.3" returns all files with "9.3" in the name.
     """
+    if (request.query is None) == (request.queries is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of 'query' or 'queries'"
+        )
+    
     correlation_id = str(uuid.uuid4())
     logger.info("Filename search request received", extra={
         "correlation_id": correlation_id,
         "query": request.query,
+        "query_count": len(request.queries or [request.query]),
         "collection": request.collection_name,
         "limit": request.limit
     })
     
+    custom_client = any([request.qdrant_url, request.qdrant_api_key, request.qdrant_verify_ssl is not None])
+    client_key = None
     try:
-        # Create Qdrant client
-        qclient = SearchSystem._create_qdrant_client(
-            qdrant_url=request.qdrant_url,
-            qdrant_api_key=request.qdrant_api_key,
-            qdrant_verify_ssl=request.qdrant_verify_ssl,
-            use_production=request.use_production
-        )
-        
-        # Use scroll with match_text filter for fuzzy filename matching
-        scroll_result = qclient.scroll(
-            collection_name=request.collection_name,
-            scroll_filter=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="metadata.filename",
-                        match=models.MatchText(text=request.query)
-                    )
-                ]
-            ),
-            limit=request.limit * 3,  # Get more to deduplicate
-            with_payload=True
-        )
+        # Connection overrides are served from the keyed client pool
+        if custom_client:
+            qclient, client_key = AsyncSearchSystem._acquire_custom_client(
+                qdrant_url=request.qdrant_url,
+                qdrant_api_key=request.qdrant_api_key,
+                qdrant_verify_ssl=request.qdrant_verify_ssl,
+                use_production=request.use_production
+            )
+            endpoint = client_key[0]
+        else:
+            qclient = AsyncSearchSystem._get_async_qdrant_client(request.use_production)
+            endpoint = AsyncSearchSystem._get_endpoint_id(request.use_production)
         
-        # Extract unique filenames
-        filenames_set = set()
-        results = []
+        pool = AsyncSearchSystem._custom_client_pool
+        with server_timing("catalog"):
+            catalog = await AsyncSearchSystem._filename_catalogs.get(
+                (endpoint, request.collection_name),
+                qclient,
+                request.collection_name,
+                retain=(lambda: pool.retain(client_key)) if client_key else None,
+                release=(lambda: pool.release(client_key)) if client_key else None
+            )
         
-        for point in scroll_result[0]:
-            if "metadata" in point.payload and "filename" in point.payload["metadata"]:
-                filename = point.payload["metadata"]["filename"]
-                if filename not in filenames_set:
-                    filenames_set.add(filename)
-                    results.append({
-                        "filename": filename,
-                        "score": point.score if hasattr(point, 'score') else None
-                    })
-                    
-                    # Stop when we have enough unique filenames
-                    if len(results) >= request.limit:
-                        break
+        min_score = request.min_score if request.min_score is not None else FILENAME_MIN_SCORE
+        responses: List[FilenameSearchResponse] = []
+        queries = request.queries or [request.query]
+
+        def match():
+            for query in queries:
+                matches = catalog.search(query, request.limit, min_score)
+                responses.append({
+                    "query": query,
+                    "total_matches": len(matches),
+                    "filenames": matches
+                })
+
+        with server_timing("match"):
+            if len(catalog) * len(queries) > FILENAME_MATCH_INLINE_MAX:
+                await asyncio.to_thread(match)
+            else:
+                match()
         
-        logger.info(f"Found {len(results)} unique matching filenames", extra={
-            "correlation_id": correlation_id
+        logger.info(f"Found {sum(r['total_matches'] for r in responses)} matching filenames", extra={
+            "correlation_id": correlation_id,
+            "catalog_size": len(catalog)
         })
         
-        return {
-            "query": request.query,
-            "total_matches": len(results),
-            "filenames": results
-        }
+        if request.queries is not None:
+            return FastJSONResponse({"results": responses})
+        return FastJSONResponse(responses[0])
     
     except Exception as e:
         logger.error(f"Filename search failed: {str(e)}", extra={
@@ -855,6 +3485,9 @@ async def search_filenames(request: FilenameSearchRequest, authenticated: bool =
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Filename search failed: {str(e)}"
         )
+    finally:
+        if client_key is not None:
+            AsyncSearchSystem._release_custom_client(client_key)
 
 if __name__ == "__main__":
     uvicorn.run(
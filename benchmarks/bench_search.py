@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Offline /search benchmark.
+
+Runs the FastAPI app in-process against a fake Ollama and an in-memory Qdrant
+collection of synthetic release-note pages, and reports throughput and
+p50/p95/p99 latency for every combination of query count, limit and
+context_window_size. Results are written as JSON so runs can be compared:
+
+    python benchmarks/bench_search.py --queries 1,4 --limits 5,10 --windows 0,5
+    python benchmarks/bench_search.py --compare benchmarks/results/search-<stamp>.json
+
+Search profiles (hnsw_ef, exact, quantization rescore/oversampling) only take
+effect on a Qdrant server, since the in-memory mode always searches exactly:
+
+    python benchmarks/bench_search.py --qdrant-url http://localhost:6333 \
+        --quantization scalar --profiles default,fast,balanced,accurate
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from typing import Dict, List, Optional
+
+import httpx
+import ollama
+from qdrant_client import AsyncQdrantClient, models
+
+from common import (
+    compare_results, fake_ollama_app, latency_summary, load_app, run_metadata,
+    sample_queries, seed_collection, synthetic_corpus, write_results
+)
+
+COLLECTION = "bench_content"
+KEY_FIELDS = ["search_profile", "queries", "limit", "context_window_size"]
+QUANTIZATION = {
+    "none": None,
+    "scalar": models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, always_ram=True)),
+    "binary": models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True)),
+}
+
+
+def int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def str_list(value: str) -> List[str]:
+    return [item for item in value.split(",") if item]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=50, help="documents in the synthetic corpus")
+    parser.add_argument("--pages", type=int, default=40, help="pages per document")
+    parser.add_argument("--page-words", type=int, default=120, help="words per page")
+    parser.add_argument("--dim", type=int, default=384, help="embedding dimension")
+    parser.add_argument("--queries", type=int_list, default=[1, 4], help="queries per request (comma separated)")
+    parser.add_argument("--limits", type=int_list, default=[5, 10], help="result limits (comma separated)")
+    parser.add_argument("--windows", type=int_list, default=[0, 5], help="context_window_size values (comma separated)")
+    parser.add_argument("--profiles", type=str_list, default=["default"],
+                        help="search_profile values (comma separated): default, fast, balanced, accurate")
+    parser.add_argument("--recall-queries", type=int, default=20,
+                        help="requests per combination whose results are compared with exact search (0 disables)")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per combination")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per combination")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight")
+    parser.add_argument("--ollama-latency-ms", type=float, default=0.0, help="simulated latency per embedding call")
+    parser.add_argument("--cache", choices=["warm", "cold"], default="warm",
+                        help="cold disables the embedding, page and response caches")
+    parser.add_argument("--response-cache", action="store_true",
+                        help="keep the whole-response cache on (off by default so every request does the work)")
+    parser.add_argument("--qdrant-url", help="seed and search a Qdrant server instead of the in-memory mode")
+    parser.add_argument("--quantization", choices=sorted(QUANTIZATION), default="none",
+                        help="quantization of the benchmark collection (Qdrant server only)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/search-<timestamp>.json)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    return parser.parse_args()
+
+
+def app_environment(args) -> Dict[str, str]:
+    env = {
+        "API_KEY_ENABLED": "false",
+        "DEFAULT_VECTOR_SIZE": str(args.dim),
+        "AUTO_CREATE_COLLECTIONS": "false",
+    }
+    if not args.response_cache or args.cache == "cold":
+        env["RESPONSE_CACHE_SIZE"] = "0"
+    if args.cache == "cold":
+        env.update({"EMBEDDING_CACHE_SIZE": "0", "PAGE_CACHE_MAX_BYTES": "0"})
+    return env
+
+
+def request_body(rng: random.Random, profile: str, queries: int, limit: int, window: int) -> Dict:
+    return {
+        "collection_name": COLLECTION,
+        "search_queries": sample_queries(rng, queries),
+        "limit": limit,
+        "context_window_size": window,
+        "search_profile": profile,
+        "response_mode": "refs"
+    }
+
+
+def hit_keys(query_results: List[Dict]) -> set:
+    return {(result.get("filename"), result.get("center_page")) for result in query_results}
+
+
+async def measure_recall(client: httpx.AsyncClient, rng: random.Random, profile: str, queries: int,
+                         limit: int, window: int, requests: int) -> Optional[float]:
+    """Share of exact-search hits (filename, center page) that the profile also returns"""
+    found = expected = 0
+    for _ in range(requests):
+        body = request_body(rng, profile, queries, limit, window)
+        exact = dict(body, search_profile="default", search_params={"exact": True})
+        response, reference = await client.post("/search", json=body), await client.post("/search", json=exact)
+        if response.status_code != 200 or reference.status_code != 200:
+            continue
+        for results, exact_results in zip(response.json()["results"], reference.json()["results"]):
+            expected_keys = hit_keys(exact_results)
+            found += len(hit_keys(results) & expected_keys)
+            expected += len(expected_keys)
+    return round(found / expected, 4) if expected else None
+
+
+async def run_combination(client: httpx.AsyncClient, rng: random.Random, profile: str, queries: int,
+                          limit: int, window: int, requests: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        body = request_body(rng, profile, queries, limit, window)
+        body["response_mode"] = "full"
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/search", json=body)
+            elapsed = time.perf_counter() - start
+        if response.status_code == 200:
+            latencies.append(elapsed)
+        else:
+            errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    wall = time.perf_counter() - start
+    return {
+        "search_profile": profile,
+        "queries": queries,
+        "limit": limit,
+        "context_window_size": window,
+        "requests": requests,
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": latency_summary(latencies)
+    }
+
+
+async def run(args) -> Dict:
+    main = load_app(app_environment(args))
+    rng = random.Random(args.seed)
+
+    started = time.perf_counter()
+    qdrant = AsyncQdrantClient(url=args.qdrant_url) if args.qdrant_url else AsyncQdrantClient(":memory:")
+    await seed_collection(qdrant, COLLECTION, synthetic_corpus(args.files, args.pages, args.dim, args.page_words, args.seed),
+                          args.dim, quantization_config=QUANTIZATION[args.quantization])
+    print(f"Seeded {args.files * args.pages} pages in {time.perf_counter() - started:.1f}s")
+
+    fake_ollama = fake_ollama_app(args.dim, args.ollama_latency_ms / 1000)
+    main.AsyncSearchSystem._async_qdrant_pool_dev = qdrant
+    main.AsyncSearchSystem._async_ollama_pool = ollama.AsyncClient(
+        host="http://fake-ollama", transport=httpx.ASGITransport(app=fake_ollama)
+    )
+
+    runs = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench",
+                                 timeout=None) as client:
+        for profile, queries, limit, window in itertools.product(args.profiles, args.queries, args.limits, args.windows):
+            if args.warmup:
+                await run_combination(client, rng, profile, queries, limit, window, args.warmup, args.concurrency)
+            result = await run_combination(client, rng, profile, queries, limit, window, args.requests, args.concurrency)
+            result["recall"] = await measure_recall(
+                client, rng, profile, queries, limit, window, args.recall_queries
+            ) if args.recall_queries else None
+            runs.append(result)
+            latency = result["latency_ms"]
+            print(f"profile={profile:<9} queries={queries:<3} limit={limit:<3} window={window:<3} "
+                  f"{result['throughput_rps']:>8.1f} req/s  p50 {latency.get('p50', 0):>8.2f}ms  "
+                  f"p95 {latency.get('p95', 0):>8.2f}ms  p99 {latency.get('p99', 0):>8.2f}ms  "
+                  f"recall {result['recall'] if result['recall'] is not None else '-'}  errors {result['errors']}")
+
+    return {
+        "benchmark": "search",
+        "metadata": run_metadata(args),
+        "corpus": {"files": args.files, "pages": args.pages, "points": args.files * args.pages, "dim": args.dim,
+                   "quantization": args.quantization},
+        "ollama_calls": dict(fake_ollama.state.calls),
+        "runs": runs
+    }
+
+
+def main():
+    args = parse_args()
+    results = asyncio.run(run(args))
+    path = write_results(results, args.output, "search")
+    print(f"\nResults written to {path}")
+    if args.compare:
+        compare_results(results["runs"], args.compare, KEY_FIELDS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Response serialization benchmark.
+
+Compares encode time and Python-level allocations of search response bodies of
+realistic sizes across three paths:
+
+    fastapi_default  jsonable_encoder + JSONResponse (returning a plain dict)
+    stdlib_json      JSONResponse without jsonable_encoder
+    fast_json        FastJSONResponse (orjson when installed)
+
+    python benchmarks/bench_serialization.py --repeat 50
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from common import VOCABULARY, load_app, run_metadata, write_results
+
+# name: (queries, results per query, pages per result, characters per page)
+PRESETS = {
+    "small": (1, 5, 1, 2000),
+    "medium": (3, 5, 11, 2000),
+    "large": (5, 10, 23, 3000),
+}
+FILENAME_MATCHES = 1000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--presets", default="small,medium,large,filenames",
+                        help=f"payloads to encode (comma separated): {', '.join(PRESETS)}, filenames")
+    parser.add_argument("--repeat", type=int, default=30, help="timed encodes per payload and path")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/serialization-<timestamp>.json)")
+    return parser.parse_args()
+
+
+def page_text(rng: random.Random, chars: int) -> str:
+    # A few non-ASCII characters, as found in real release notes
+    words = []
+    length = 0
+    while length < chars:
+        word = rng.choice(VOCABULARY) if rng.random() > 0.02 else rng.choice(["café", "–", "µs", "≥"])
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:chars]
+
+
+def search_payload(rng: random.Random, queries: int, results: int, pages: int, chars: int) -> Dict[str, Any]:
+    return {"results": [
+        [
+            {
+                "filename": f"ECOS_9.{q}.{r}.0_Release_Notes_RevB",
+                "score": rng.random(),
+                "center_page": 10 + r,
+                "combined_page": " ".join(page_text(rng, chars) for _ in range(pages)),
+                "page_numbers": list(range(10 + r - pages // 2, 10 + r - pages // 2 + pages))
+            }
+            for r in range(results)
+        ]
+        for q in range(queries)
+    ]}
+
+
+def filenames_payload(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "query": "ecos 9.3",
+        "total_matches": FILENAME_MATCHES,
+        "filenames": [
+            {"filename": f"ECOS_9.3.{i}.0_Release_Notes_RevB", "score": round(rng.random(), 4)}
+            for i in range(FILENAME_MATCHES)
+        ]
+    }
+
+
+def encoders(main) -> Dict[str, Callable[[Any], bytes]]:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    return {
+        "fastapi_default": lambda body: JSONResponse(jsonable_encoder(body)).body,
+        "stdlib_json": lambda body: JSONResponse(body).body,
+        "fast_json": lambda body: main.FastJSONResponse(body).body,
+    }
+
+
+def measure(encode: Callable[[Any], bytes], body: Any, repeat: int) -> Dict[str, Any]:
+    size = len(encode(body))
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encode(body)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    encode(body)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        "bytes": size,
+        "encode_ms": {
+            "median": round(median * 1000, 4),
+            "min": round(min(timings) * 1000, 4),
+            "max": round(max(timings) * 1000, 4)
+        },
+        "mb_per_second": round(size / median / 1e6, 1) if median else None,
+        "peak_alloc_kb": round(peak / 1024, 1)
+    }
+
+
+def main():
+    args = parse_args()
+    app = load_app({"API_KEY_ENABLED": "false"})
+    rng = random.Random(args.seed)
+    paths = encoders(app)
+
+    runs = []
+    for preset in args.presets.split(","):
+        body = filenames_payload(rng) if preset == "filenames" else search_payload(rng, *PRESETS[preset])
+        baseline_ms = None
+        for encoder, encode in paths.items():
+            result = measure(encode, body, args.repeat)
+            baseline_ms = baseline_ms or result["encode_ms"]["median"]
+            result.update({
+                "payload": preset,
+                "encoder": encoder,
+                "speedup": round(baseline_ms / result["encode_ms"]["median"], 2)
+            })
+            runs.append(result)
+            print(f"{preset:<10} {encoder:<16} {result['bytes'] / 1024:>9.1f} KiB  "
+                  f"{result['encode_ms']['median']:>9.3f} ms  {result['mb_per_second']:>8.1f} MB/s  "
+                  f"peak {result['peak_alloc_kb']:>9.1f} KiB  x{result['speedup']}")
+
+    path = write_results({
+        "benchmark": "serialization",
+        "metadata": run_metadata(args),
+        "orjson": app.orjson is not None,
+        "runs": runs
+    }, args.output, "serialization")
+    print(f"\nResults written to {path}")
+
+
+if __name__ == "__main__":
+    main()
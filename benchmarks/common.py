@@ -0,0 +1,191 @@
+"""
+Shared helpers for the offline benchmarks.
+
+The benchmarks run the FastAPI app in-process against stand-ins for the
+external services: an ASGI fake of the Ollama embedding API and qdrant-client's
+in-memory local mode, seeded with a synthetic page-structured corpus.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from qdrant_client import models
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+APP_DIR = REPO_DIR / "app"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+VOCABULARY = (
+    "dhcp dns routing bgp ospf tunnel overlay underlay firewall zone policy nat vlan "
+    "interface gateway appliance orchestrator license upgrade release notes fixed issue "
+    "known limitation memory leak crash reboot performance throughput latency packet "
+    "loss qos shaping path selection failover ha cluster certificate ssl api cli "
+    "snmp syslog netflow monitoring alarm threshold configuration template backup"
+).split()
+
+
+def load_app(env: Dict[str, str]):
+    """Import app/main.py with the given environment overrides (must run before first import)"""
+    os.environ.update(env)
+    if str(APP_DIR) not in sys.path:
+        sys.path.insert(0, str(APP_DIR))
+    import main
+    # Per-request INFO logs would dominate the measurement
+    main.logger.setLevel(logging.WARNING)
+    return main
+
+
+def fake_embedding(text: str, dim: int) -> List[float]:
+    """Deterministic bag-of-words embedding: texts sharing words get similar vectors"""
+    vector = np.zeros(dim)
+    for token in text.lower().split():
+        digest = int(hashlib.md5(token.encode()).hexdigest(), 16)
+        vector[digest % dim] += 1.0
+        vector[(digest >> 16) % dim] += 0.5
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+def fake_ollama_app(dim: int, latency: float = 0.0) -> Starlette:
+    """
+    ASGI stand-in for the Ollama embedding endpoints.
+
+    Serves /api/embed (list input) and the legacy /api/embeddings; `latency`
+    seconds are added per call to model the network and model inference.
+    """
+    calls = {"embed": 0, "embeddings": 0, "texts": 0}
+
+    async def embed(request: Request):
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        calls["embed"] += 1
+        calls["texts"] += len(texts)
+        if latency:
+            await asyncio.sleep(latency)
+        return JSONResponse({"model": body["model"], "embeddings": [fake_embedding(t, dim) for t in texts]})
+
+    async def embeddings(request: Request):
+        body = await request.json()
+        calls["embeddings"] += 1
+        calls["texts"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        return JSONResponse({"embedding": fake_embedding(body["prompt"], dim)})
+
+    app = Starlette(routes=[
+        Route("/api/embed", embed, methods=["POST"]),
+        Route("/api/embeddings", embeddings, methods=["POST"]),
+    ])
+    app.state.calls = calls
+    return app
+
+
+def synthetic_corpus(files: int, pages: int, dim: int, page_words: int = 120,
+                     seed: int = 0) -> List[models.PointStruct]:
+    """Page-structured points: `files` documents of `pages` pages each"""
+    rng = random.Random(seed)
+    points = []
+    for file_index in range(files):
+        filename = f"ECOS_{9 + file_index // 10}.{file_index % 10}.0_Release_Notes.pdf"
+        for page_number in range(1, pages + 1):
+            text = " ".join(rng.choice(VOCABULARY) for _ in range(page_words))
+            points.append(models.PointStruct(
+                id=len(points) + 1,
+                vector=fake_embedding(text, dim),
+                payload={
+                    "pagecontent": f"Page {page_number} of {filename}: {text}",
+                    "metadata": {"filename": filename, "page_number": page_number}
+                }
+            ))
+    return points
+
+
+async def seed_collection(client, collection_name: str, points: List[models.PointStruct],
+                          dim: int, batch_size: int = 512, quantization_config=None):
+    if await client.collection_exists(collection_name):
+        await client.delete_collection(collection_name)
+    await client.create_collection(
+        collection_name,
+        vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE),
+        quantization_config=quantization_config
+    )
+    for start in range(0, len(points), batch_size):
+        await client.upsert(collection_name, points[start:start + batch_size])
+
+
+def sample_queries(rng: random.Random, count: int) -> List[str]:
+    return [" ".join(rng.sample(VOCABULARY, rng.randint(2, 4))) for _ in range(count)]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """Latency statistics in milliseconds"""
+    if not latencies:
+        return {}
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(values.max()), 3)
+    }
+
+
+def run_metadata(args: Any) -> Dict[str, Any]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "arguments": vars(args)
+    }
+
+
+def write_results(payload: Dict[str, Any], output: Optional[str], prefix: str) -> Path:
+    path = Path(output) if output else RESULTS_DIR / f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2))
+    return path
+
+
+def compare_results(current: List[Dict], baseline_path: str, key_fields: List[str]):
+    """Print p50/p95/p99 and throughput changes against a previous results file"""
+    baseline = {
+        tuple(run.get(field) for field in key_fields): run
+        for run in json.loads(Path(baseline_path).read_text())["runs"]
+    }
+    print(f"\nCompared with {baseline_path}:")
+    for run in current:
+        previous = baseline.get(tuple(run[field] for field in key_fields))
+        if previous is None:
+            continue
+        label = " ".join(f"{field}={run[field]}" for field in key_fields)
+        changes = []
+        for metric in ("p50", "p95", "p99"):
+            before, after = previous["latency_ms"][metric], run["latency_ms"][metric]
+            changes.append(f"{metric} {before:.1f}->{after:.1f}ms ({(after - before) / before * 100:+.1f}%)")
+        before, after = previous["throughput_rps"], run["throughput_rps"]
+        changes.append(f"rps {before:.1f}->{after:.1f} ({(after - before) / before * 100:+.1f}%)")
+        print(f"  {label}: " + ", ".join(changes))
@@ -4,8 +4,12 @@ Configuration module for Qdrant RAG MCP Server.
 Handles environment variables and provides fallback to app defaults.
 """
 
+import importlib.util
+import logging
 import os
 from typing import Optional
+
+import httpx
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -37,6 +41,17 @@ class MCPConfig:
         self.use_production = os.getenv("USE_PRODUCTION", "true").lower() == "true"
         self.default_context_window = int(os.getenv("DEFAULT_CONTEXT_WINDOW", "5"))
         self.default_limit = int(os.getenv("DEFAULT_LIMIT", "2"))
+        # "full", "refs" (page references only) or "snippet" (best-matching passage)
+        self.response_mode = os.getenv("RESPONSE_MODE", "full")
+        
+        # HTTP Client Configuration (one keep-alive client shared by all tools)
+        self.http_timeout = float(os.getenv("HTTP_TIMEOUT", "30"))
+        self.http_max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+        self.http_max_keepalive_connections = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+        self.http_keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+        self.http2 = os.getenv("HTTP2", "false").lower() == "true"
+        # Concurrent API requests per multi-file tool call
+        self.max_concurrent_requests = max(1, int(os.getenv("MAX_CONCURRENT_REQUESTS", "4")))
     
     def get_headers(self) -> dict:
         """
@@ -50,6 +65,34 @@ class MCPConfig:
             headers["Authorization"] = f"Bearer {self.api_key}"
         return headers
     
+    def get_http_client_options(self) -> dict:
+        """
+        Build keyword arguments for the shared httpx.AsyncClient.
+        
+        HTTP/2 needs the optional h2 package (pip install "httpx[http2]");
+        without it the client falls back to HTTP/1.1 keep-alive.
+        
+        Returns:
+            dict: httpx.AsyncClient keyword arguments
+        """
+        http2 = self.http2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logging.getLogger(__name__).warning(
+                "HTTP2=true but the h2 package is not installed; using HTTP/1.1"
+            )
+            http2 = False
+        return {
+            "base_url": self.api_url,
+            "headers": self.get_headers(),
+            "timeout": self.http_timeout,
+            "limits": httpx.Limits(
+                max_connections=self.http_max_connections,
+                max_keepalive_connections=self.http_max_keepalive_connections,
+                keepalive_expiry=self.http_keepalive_expiry
+            ),
+            "http2": http2
+        }
+    
     def build_search_payload(
         self,
         search_queries: list[str],
@@ -78,6 +121,10 @@ class MCPConfig:
             "use_production": self.use_production
         }
         
+        # Smaller payloads (fewer LLM tokens) unless full page text is wanted
+        if self.response_mode != "full":
+            payload["response_mode"] = self.response_mode
+        
         # Add optional filter
         if filter_dict:
             payload["filter"] = filter_dict
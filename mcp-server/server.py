@@ -6,15 +6,97 @@ Uses Qdrant vector database for intelligent document discovery and content retri
 Provides 5 specialized tools for exploring, searching, and comparing documentation.
 """
 
+import asyncio
 import httpx
+from contextlib import asynccontextmanager
 from fastmcp import FastMCP
 from config import MCPConfig
 from typing import Optional
 
-# Initialize MCP server and config
-mcp = FastMCP("Docsplorer")
 config = MCPConfig()
 
+# One keep-alive client for all tool calls instead of a new connection per call
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared API client, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(**config.get_http_client_options())
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def post_json(path: str, payload: dict) -> dict:
+    """POST a JSON payload to the search API and return the decoded response."""
+    response = await get_http_client().post(path, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+def describe_error(error: Exception) -> str:
+    """Short, LLM-readable description of a failed API call."""
+    if isinstance(error, httpx.HTTPStatusError):
+        try:
+            detail = error.response.json().get("detail", error.response.text)
+        except ValueError:
+            detail = error.response.text
+        return f"HTTP {error.response.status_code}: {detail}"
+    return f"{type(error).__name__}: {error}"
+
+
+async def search_files(
+    query: str,
+    filename_filters: list[str],
+    limit: Optional[int] = None,
+    context_window: Optional[int] = None
+) -> dict:
+    """
+    Run one search per filename filter concurrently (at most MAX_CONCURRENT_REQUESTS at a time).
+    
+    Returns:
+        {filename_filter: results list, or the exception if that search failed}
+    """
+    semaphore = asyncio.Semaphore(config.max_concurrent_requests)
+    
+    async def search_one(filename_filter: str) -> list:
+        payload = config.build_search_payload(
+            search_queries=[query],
+            limit=limit,
+            context_window_size=context_window,
+            filter_dict={"metadata.filename": {"match_text": filename_filter}}
+        )
+        async with semaphore:
+            data = await post_json("/search", payload)
+        return data["results"][0] if data["results"] else []
+    
+    unique_filters = list(dict.fromkeys(filename_filters))
+    outcomes = await asyncio.gather(
+        *(search_one(filename_filter) for filename_filter in unique_filters),
+        return_exceptions=True
+    )
+    return dict(zip(unique_filters, outcomes))
+
+
+@asynccontextmanager
+async def lifespan(server):
+    """Close the shared HTTP client when the server shuts down."""
+    try:
+        yield
+    finally:
+        await close_http_client()
+
+
+# Initialize MCP server
+mcp = FastMCP("Docsplorer", lifespan=lifespan)
+
 
 @mcp.tool()
 async def search_filenames_fuzzy(
@@ -38,19 +120,12 @@ async def search_filenames_fuzzy(
         search_filenames_fuzzy("ecos 9.3", limit=5)
         # Returns: {"total_matches": 3, "filenames": [{"filename": "ECOS_9.3.6.0_Release_Notes_RevB", "score": 0.95}, ...]}
     """
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(
-            f"{config.api_url}/search/filenames",
-            json={
-                "query": query,
-                "collection_name": config.qdrant_collection,
-                "limit": limit or config.default_limit,
-                "use_production": config.use_production
-            },
-            headers=config.get_headers()
-        )
-        response.raise_for_status()
-        return response.json()
+    return await post_json("/search/filenames", {
+        "query": query,
+        "collection_name": config.qdrant_collection,
+        "limit": limit or config.default_limit,
+        "use_production": config.use_production
+    })
 
 
 @mcp.tool()
@@ -86,14 +161,7 @@ async def search_with_filename_filter(
         filter_dict={"metadata.filename": {"match_text": filename_filter}}
     )
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(
-            f"{config.api_url}/search",
-            json=payload,
-            headers=config.get_headers()
-        )
-        response.raise_for_status()
-        return response.json()
+    return await post_json("/search", payload)
 
 
 @mcp.tool()
@@ -130,14 +198,7 @@ async def search_multi_query_with_filter(
         filter_dict={"metadata.filename": {"match_text": filename_filter}}
     )
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(
-            f"{config.api_url}/search",
-            json=payload,
-            headers=config.get_headers()
-        )
-        response.raise_for_status()
-        return response.json()
+    return await post_json("/search", payload)
 
 
 @mcp.tool()
@@ -162,35 +223,29 @@ async def search_across_multiple_files(
         
     Returns:
         {"query": str, "results_by_file": {"filename1": [results], "filename2": [results], ...}}
+        Files whose search failed are listed in "errors": {"filename3": "error message"} instead.
         
     Example:
         search_across_multiple_files("DHCP security", ["ECOS_9.3.5.0", "ECOS_9.3.6.0", "ECOS_9.3.7.0"], limit=2, context_window=5)
         # Returns DHCP info from all 3 versions, grouped by file
     """
-    results_by_file = {}
+    outcomes = await search_files(query, filename_filters, limit, context_window)
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        for filename_filter in filename_filters:
-            payload = config.build_search_payload(
-                search_queries=[query],
-                limit=limit,
-                context_window_size=context_window,
-                filter_dict={"metadata.filename": {"match_text": filename_filter}}
-            )
-            
-            response = await client.post(
-                f"{config.api_url}/search",
-                json=payload,
-                headers=config.get_headers()
-            )
-            response.raise_for_status()
-            data = response.json()
-            results_by_file[filename_filter] = data["results"][0] if data["results"] else []
+    results_by_file = {}
+    errors = {}
+    for filename_filter, outcome in outcomes.items():
+        if isinstance(outcome, Exception):
+            errors[filename_filter] = describe_error(outcome)
+        else:
+            results_by_file[filename_filter] = outcome
     
-    return {
+    result = {
         "query": query,
         "results_by_file": results_by_file
     }
+    if errors:
+        result["errors"] = errors
+    return result
 
 
 @mcp.tool()
@@ -217,52 +272,25 @@ async def compare_versions(
         
     Returns:
         {"query": str, "version1": {"filename": str, "results": [...]}, "version2": {"filename": str, "results": [...]}}
+        A version whose search failed has empty "results" and an "error" message.
         
     Example:
         compare_versions("DHCP security", "ECOS_9.3.6.0_Release_Notes", "ECOS_9.3.7.0_Release_Notes", limit=2, context_window=5)
         # Returns side-by-side comparison
     """
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        # Get results for version 1
-        payload_v1 = config.build_search_payload(
-            search_queries=[query],
-            limit=limit,
-            context_window_size=context_window,
-            filter_dict={"metadata.filename": {"match_text": version1_filter}}
-        )
-        response_v1 = await client.post(
-            f"{config.api_url}/search",
-            json=payload_v1,
-            headers=config.get_headers()
-        )
-        response_v1.raise_for_status()
-        data_v1 = response_v1.json()
-        
-        # Get results for version 2
-        payload_v2 = config.build_search_payload(
-            search_queries=[query],
-            limit=limit,
-            context_window_size=context_window,
-            filter_dict={"metadata.filename": {"match_text": version2_filter}}
-        )
-        response_v2 = await client.post(
-            f"{config.api_url}/search",
-            json=payload_v2,
-            headers=config.get_headers()
-        )
-        response_v2.raise_for_status()
-        data_v2 = response_v2.json()
+    # Both versions are searched concurrently
+    outcomes = await search_files(query, [version1_filter, version2_filter], limit, context_window)
+    
+    def version_result(filename_filter: str) -> dict:
+        outcome = outcomes[filename_filter]
+        if isinstance(outcome, Exception):
+            return {"filename": filename_filter, "results": [], "error": describe_error(outcome)}
+        return {"filename": filename_filter, "results": outcome}
     
     return {
         "query": query,
-        "version1": {
-            "filename": version1_filter,
-            "results": data_v1["results"][0] if data_v1["results"] else []
-        },
-        "version2": {
-            "filename": version2_filter,
-            "results": data_v2["results"][0] if data_v2["results"] else []
-        }
+        "version1": version_result(version1_filter),
+        "version2": version_result(version2_filter)
     }
 
 
@@ -1,7 +1,7 @@
 #!/bin/bash
 
 # ============================================================================
-# COMPREHENSIVE API TEST SUITE - 50 Tests
+# COMPREHENSIVE API TEST SUITE - 60 Tests
 # Testing Qdrant Semantic Search API with Production Data
 # Embedding Models: granite-embedding:30m (384d) for filenames, bge-m3 (1024d) for content
 # ============================================================================
@@ -299,6 +299,51 @@ run_test "Health check endpoint" \
     "curl -s -X GET $API_URL/health" \
     "status"
 
+# ============================================================================
+# SECTION 11: NEW ENDPOINTS AND RESPONSE MODES (10 tests)
+# ============================================================================
+echo -e "\n${YELLOW}=== SECTION 11: NEW ENDPOINTS AND RESPONSE MODES ===${NC}"
+
+run_test "Readiness endpoint" \
+    "curl -s -X GET $API_URL/ready" \
+    "\"status\":\"ready\""
+
+run_test "Heterogeneous batch - different limits and filters" \
+    "curl -s -X POST $API_URL/search/batch -H 'Content-Type: application/json' -d '{\"collection_name\": \"content\", \"embedding_model\": \"bge-m3\", \"use_production\": true, \"searches\": [{\"search_queries\": [\"installation requirements\"], \"limit\": 1}, {\"search_queries\": [\"upgrade\"], \"limit\": 2, \"filter\": {\"metadata.filename\": {\"match_text\": \"ECOS\"}}}]}'" \
+    "results"
+
+run_test "Batch with invalid filter returns 400" \
+    "curl -s -o /dev/null -w '%{http_code}' -X POST $API_URL/search/batch -H 'Content-Type: application/json' -d '{\"collection_name\": \"content\", \"use_production\": true, \"searches\": [{\"search_queries\": [\"upgrade\"], \"filter\": {\"metadata.page_number\": {\"gte\": 10, \"lte\": 1}}}]}'" \
+    "400"
+
+run_test "Response mode refs (no combined_page)" \
+    "curl -s -X POST $API_URL/search -H 'Content-Type: application/json' -d '{\"collection_name\": \"content\", \"search_queries\": [\"installation requirements\"], \"embedding_model\": \"bge-m3\", \"use_production\": true, \"limit\": 2, \"response_mode\": \"refs\"}' | grep -v combined_page" \
+    "page_numbers"
+
+run_test "Response mode snippet" \
+    "curl -s -X POST $API_URL/search -H 'Content-Type: application/json' -d '{\"collection_name\": \"content\", \"search_queries\": [\"installation requirements\"], \"embedding_model\": \"bge-m3\", \"use_production\": true, \"limit\": 2, \"response_mode\": \"snippet\", \"snippet_chars\": 200}'" \
+    "snippet_start"
+
+run_test "Streaming NDJSON" \
+    "curl -s -N -X POST $API_URL/search -H 'Content-Type: application/json' -d '{\"collection_name\": \"content\", \"search_queries\": [\"installation requirements\", \"upgrade\"], \"embedding_model\": \"bge-m3\", \"use_production\": true, \"limit\": 2, \"stream\": \"ndjson\"}'" \
+    "\"done\":true"
+
+run_test "Streaming SSE" \
+    "curl -s -N -X POST $API_URL/search -H 'Content-Type: application/json' -d '{\"collection_name\": \"content\", \"search_queries\": [\"installation requirements\"], \"embedding_model\": \"bge-m3\", \"use_production\": true, \"limit\": 2, \"stream\": \"sse\"}'" \
+    "event: done"
+
+run_test "Filename search batch mode" \
+    "curl -s -X POST $API_URL/search/filenames -H 'Content-Type: application/json' -d '{\"collection_name\": \"content\", \"queries\": [\"ECOS 9.3\", \"Orchestrator\"], \"use_production\": true, \"limit\": 3}'" \
+    "total_matches"
+
+run_test "Cache stats" \
+    "curl -s -X GET $API_URL/cache/stats" \
+    "hit_ratio"
+
+run_test "Prometheus metrics" \
+    "curl -s -X GET $API_URL/metrics" \
+    "search_api_stage_duration_seconds"
+
 # ============================================================================
 # FINAL RESULTS
 # ============================================================================
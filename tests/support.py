@@ -0,0 +1,104 @@
+"""
+Shared fixtures of the offline behaviour tests.
+
+The app runs in-process with the fake Ollama and in-memory Qdrant of
+benchmarks/common.py, seeded with a small synthetic corpus. Every module gets
+the same imported app, so the environment below applies to all tests.
+"""
+import asyncio
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import ollama
+import pytest
+from qdrant_client import AsyncQdrantClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+from common import fake_embedding, fake_ollama_app, load_app, sample_queries, seed_collection, synthetic_corpus
+
+COLLECTION = "test_content"
+DIM = 64
+FILES = 8
+PAGES = 20
+
+main = load_app({
+    "API_KEY_ENABLED": "false",
+    "DEFAULT_VECTOR_SIZE": str(DIM),
+    "AUTO_CREATE_COLLECTIONS": "false",
+    "EMBEDDING_STORE_PATH": "",
+    "WARMUP_POOLS": "dev",
+    "WARMUP_COLLECTIONS": COLLECTION,
+})
+CORPUS = synthetic_corpus(FILES, PAGES, DIM)
+FILENAMES = sorted({point.payload["metadata"]["filename"] for point in CORPUS})
+
+
+def without_scores(results: List[List[Dict]]) -> List[List[Dict]]:
+    return [[{k: v for k, v in r.items() if k != "score"} for r in query_results] for query_results in results]
+
+
+def assert_same_results(actual: List[List[Dict]], expected: List[List[Dict]]):
+    """Equal results; scores may differ in the last digits, which local mode does between identical calls"""
+    assert without_scores(actual) == without_scores(expected)
+    for actual_results, expected_results in zip(actual, expected):
+        assert [r["score"] for r in actual_results] == pytest.approx([r["score"] for r in expected_results], abs=1e-6)
+
+
+def random_filter(rng: random.Random) -> Optional[Dict]:
+    kind = rng.choice(["none", "none", "filename", "filenames", "pages"])
+    if kind == "filename":
+        return {"metadata.filename": {"match_value": rng.choice(FILENAMES)}}
+    if kind == "filenames":
+        return {"metadata.filename": {"match_value": rng.sample(FILENAMES, 3)}}
+    if kind == "pages":
+        start = rng.randint(1, PAGES)
+        return {"metadata.page_number": {"gte": start, "lte": min(PAGES, start + rng.randint(0, 10))}}
+    return None
+
+
+def random_request(rng: random.Random) -> Dict:
+    body = {
+        "collection_name": COLLECTION,
+        "search_queries": sample_queries(rng, rng.randint(1, 4)),
+        "limit": rng.randint(1, 8),
+        "context_window_size": rng.randint(0, 6),
+    }
+    filter = random_filter(rng)
+    if filter:
+        body["filter"] = filter
+    return body
+
+
+def reset_caches():
+    """Empty every process-wide cache of the search systems"""
+    for owner in (main.SearchSystem, main.AsyncSearchSystem):
+        for value in vars(owner).values():
+            if hasattr(value, "invalidate"):
+                value.invalidate()
+
+
+def run_with_app(scenario, ollama_app=None):
+    """
+    Run scenario(client, qdrant) against a freshly seeded collection and empty caches.
+
+    client is an httpx client bound to the app; ollama_app replaces the default
+    fake Ollama, e.g. to count or fail embedding calls.
+    """
+    async def run():
+        qdrant = AsyncQdrantClient(":memory:")
+        await seed_collection(qdrant, COLLECTION, CORPUS, DIM)
+        reset_caches()
+        main.AsyncSearchSystem._async_qdrant_pool_dev = qdrant
+        main.AsyncSearchSystem._async_ollama_pool = ollama.AsyncClient(
+            host="http://fake-ollama", transport=httpx.ASGITransport(app=ollama_app or fake_ollama_app(DIM))
+        )
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app),
+                                         base_url="http://test", timeout=None) as client:
+                await scenario(client, qdrant)
+        finally:
+            await main.AsyncSearchSystem.close_pools()
+    asyncio.run(run())
@@ -0,0 +1,24 @@
+"""/search/batch: heterogeneous sub-requests in one round trip."""
+import random
+
+from support import COLLECTION, assert_same_results, random_request, run_with_app
+
+
+def test_batch_endpoint_matches_single_searches():
+    async def scenario(client, qdrant):
+        rng = random.Random(11)
+        searches = [random_request(rng) for _ in range(6)]
+        response = await client.post("/search/batch", json={
+            "collection_name": COLLECTION,
+            "searches": [
+                {key: body[key] for key in ("search_queries", "filter", "limit", "context_window_size") if key in body}
+                for body in searches
+            ]
+        })
+        assert response.status_code == 200, response.text
+        grouped = response.json()["results"]
+        assert len(grouped) == len(searches)
+        for body, group in zip(searches, grouped):
+            single = await client.post("/search", json=body)
+            assert_same_results(group["results"], single.json()["results"])
+    run_with_app(scenario)
@@ -0,0 +1,80 @@
+"""Batched query embedding: one /api/embed call per request, with the legacy fallback."""
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from support import COLLECTION, DIM, fake_embedding, fake_ollama_app, main, run_with_app
+
+
+def legacy_ollama_app() -> Starlette:
+    """An Ollama that predates the list-input /api/embed endpoint"""
+    calls = {"embed": 0, "embeddings": 0}
+
+    async def embed(request):
+        calls["embed"] += 1
+        return PlainTextResponse("404 page not found", status_code=404)
+
+    async def embeddings(request):
+        body = await request.json()
+        calls["embeddings"] += 1
+        return JSONResponse({"embedding": fake_embedding(body["prompt"], DIM)})
+
+    app = Starlette(routes=[
+        Route("/api/embed", embed, methods=["POST"]),
+        Route("/api/embeddings", embeddings, methods=["POST"]),
+    ])
+    app.state.calls = calls
+    return app
+
+
+def search_body(queries, **fields):
+    return dict({"collection_name": COLLECTION, "search_queries": queries, "limit": 2}, **fields)
+
+
+def test_all_queries_of_a_request_share_one_embed_call():
+    ollama_app = fake_ollama_app(DIM)
+
+    async def scenario(client, qdrant):
+        response = await client.post("/search", json=search_body(["bgp routing", "nat policy", "ha failover"]))
+        assert response.status_code == 200
+        assert len(response.json()["results"]) == 3
+        assert ollama_app.state.calls == {"embed": 1, "embeddings": 0, "texts": 3}
+    run_with_app(scenario, ollama_app)
+
+
+def test_servers_without_batch_embed_fall_back_to_single_calls(monkeypatch):
+    monkeypatch.setattr(main.SearchSystem, "_batch_embed_supported", True)
+    ollama_app = legacy_ollama_app()
+
+    async def scenario(client, qdrant):
+        response = await client.post("/search", json=search_body(["bgp routing", "nat policy"]))
+        assert response.status_code == 200
+        assert ollama_app.state.calls == {"embed": 1, "embeddings": 2}
+        assert main.SearchSystem._batch_embed_supported is False
+        # Later requests go straight to the single-text endpoint
+        assert (await client.post("/search", json=search_body(["qos shaping"]))).status_code == 200
+        assert ollama_app.state.calls == {"embed": 1, "embeddings": 3}
+    run_with_app(scenario, ollama_app)
+
+
+def test_unknown_model_does_not_disable_batch_embed(monkeypatch):
+    monkeypatch.setattr(main.SearchSystem, "_batch_embed_supported", True)
+    calls = {"embed": 0}
+
+    async def embed(request):
+        body = await request.json()
+        calls["embed"] += 1
+        if body["model"] != "mxbai-embed-large":
+            return JSONResponse({"error": f'model "{body["model"]}" not found, try pulling it first'},
+                                status_code=404)
+        return JSONResponse({"embeddings": [fake_embedding(text, DIM) for text in body["input"]]})
+
+    ollama_app = Starlette(routes=[Route("/api/embed", embed, methods=["POST"])])
+
+    async def scenario(client, qdrant):
+        response = await client.post("/search", json=search_body(["bgp routing"], embedding_model="no-such-model"))
+        assert response.status_code == 400
+        assert main.SearchSystem._batch_embed_supported is True
+        assert (await client.post("/search", json=search_body(["bgp routing"]))).status_code == 200
+        assert calls["embed"] == 2
+    run_with_app(scenario, ollama_app)
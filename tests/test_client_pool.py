@@ -0,0 +1,94 @@
+"""Pool of per-request override Qdrant clients: reuse, eviction and the idle sweeper."""
+import asyncio
+import hashlib
+
+from support import main
+
+
+class FakeClient:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_clients_are_reused_per_key():
+    async def run():
+        pool = main.QdrantClientPool(max_size=4, idle_timeout=0)
+        first = pool.acquire(("a", True), lambda: FakeClient("a"))
+        pool.release(("a", True))
+        assert pool.acquire(("a", True), lambda: FakeClient("again")) is first
+        assert pool.acquire(("a", False), lambda: FakeClient("b")) is not first
+        assert (pool.hits, pool.misses) == (1, 2)
+        await pool.close_all()
+        assert first.closed
+    asyncio.run(run())
+
+
+def test_idle_clients_over_max_size_are_closed_first():
+    async def run():
+        pool = main.QdrantClientPool(max_size=2, idle_timeout=0)
+        clients = {}
+        for key in ("a", "b"):
+            clients[key] = pool.acquire((key,), lambda key=key: FakeClient(key))
+        pool.release(("a",))
+        # "b" is still in use, so the idle "a" makes room for "c"
+        clients["c"] = pool.acquire(("c",), lambda: FakeClient("c"))
+        await asyncio.sleep(0)
+        assert clients["a"].closed
+        assert not clients["b"].closed and not clients["c"].closed
+        assert pool.stats()["open_clients"] == 2
+        assert pool.evictions == 1
+    asyncio.run(run())
+
+
+def test_clients_in_use_are_never_closed():
+    async def run():
+        pool = main.QdrantClientPool(max_size=1, idle_timeout=0)
+        a = pool.acquire(("a",), lambda: FakeClient("a"))
+        b = pool.acquire(("b",), lambda: FakeClient("b"))
+        await asyncio.sleep(0)
+        assert not a.closed and not b.closed
+        pool.release(("a",))
+        await asyncio.sleep(0)
+        assert a.closed and not b.closed
+    asyncio.run(run())
+
+
+def test_sweeper_closes_idle_clients_without_further_traffic():
+    async def run():
+        pool = main.QdrantClientPool(max_size=4, idle_timeout=0.05)
+        client = pool.acquire(("a",), lambda: FakeClient("a"))
+        pool.release(("a",))
+        pool.start_sweeper()
+        try:
+            await asyncio.sleep(0.2)
+        finally:
+            await pool.stop_sweeper()
+        assert client.closed
+        assert pool.stats()["open_clients"] == 0
+    asyncio.run(run())
+
+
+def test_pool_key_hashes_the_full_api_key():
+    params = {"host": "qdrant.example.com", "port": 6333, "https": True}
+    first = main.SearchSystem._endpoint_id_from_params(dict(params, api_key="secret-1"))
+    second = main.SearchSystem._endpoint_id_from_params(dict(params, api_key="secret-2"))
+    assert first != second
+    assert "secret-1" not in first
+    assert first.endswith("#" + hashlib.sha256(b"secret-1").hexdigest())
+
+
+def test_override_requests_hand_their_client_back():
+    async def run():
+        pool = main.AsyncSearchSystem._custom_client_pool
+        system = main.AsyncSearchSystem("docs", qdrant_url="http://qdrant.example.com:6333", qdrant_verify_ssl=False)
+        key = system._client_key
+        assert pool._entries[key][1] == 1
+        await system.close()
+        await system.close()
+        assert pool._entries[key][1] == 0
+        await pool.close_all()
+    asyncio.run(run())
@@ -0,0 +1,49 @@
+"""Query-embedding cache: TTL expiry, LRU eviction and reuse across requests."""
+from support import COLLECTION, DIM, fake_ollama_app, main, run_with_app
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(main.time, "monotonic", lambda: now[0])
+    cache = main.TTLCache(max_size=10, ttl=60)
+    cache.set("a", 1)
+    now[0] += 59
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = main.TTLCache(max_size=2, ttl=0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_zero_size_disables_the_cache():
+    cache = main.TTLCache(max_size=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_repeated_queries_are_embedded_once():
+    ollama_app = fake_ollama_app(DIM)
+
+    async def scenario(client, qdrant):
+        body = {"collection_name": COLLECTION, "search_queries": ["bgp routing", "ha failover"], "limit": 2}
+        assert (await client.post("/search", json=body)).status_code == 200
+        assert ollama_app.state.calls["texts"] == 2
+        hits = main.SearchSystem._embedding_cache.hits
+        # Whitespace variants share the normalized cache key
+        body["search_queries"] = [" bgp  routing", "ha failover", "nat policy"]
+        assert (await client.post("/search", json=body)).status_code == 200
+        assert ollama_app.state.calls["texts"] == 3
+        assert main.SearchSystem._embedding_cache.hits == hits + 2
+    run_with_app(scenario, ollama_app)
+
@@ -0,0 +1,98 @@
+"""Persistent SQLite embedding store shared by workers and restarts."""
+import asyncio
+import sqlite3
+
+from support import COLLECTION, DIM, assert_same_results, fake_ollama_app, main, run_with_app
+
+
+class FailingConnection:
+    """Connection stand-in whose DELETE statements fail like a corrupt or read-only database"""
+
+    def __init__(self, db):
+        self.db = db
+        self.statements = []
+
+    def execute(self, statement, *args):
+        self.statements.append(statement)
+        if statement.startswith("DELETE"):
+            raise sqlite3.OperationalError("attempt to write a readonly database")
+        return self.db.execute(statement, *args)
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+
+def test_vectors_survive_reopening(tmp_path):
+    path = str(tmp_path / "store.db")
+    store = main.EmbeddingStore(path, max_bytes=1 << 20)
+    store.put_many("model", {"bgp routing": [0.5, -1.25, 2.0]})
+    reopened = main.EmbeddingStore(path, max_bytes=1 << 20)
+    assert reopened.get_many("model", ["bgp routing", "nat"]) == {"bgp routing": [0.5, -1.25, 2.0]}
+    assert reopened.get_many("other-model", ["bgp routing"]) == {}
+    assert (reopened.hits, reopened.misses) == (1, 2)
+    assert reopened.stats()["entries"] == 1
+
+
+def test_least_recently_used_vectors_are_evicted_over_max_bytes(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(main.time, "time", lambda: now[0])
+    # Room for two 16-byte vectors
+    store = main.EmbeddingStore(str(tmp_path / "store.db"), max_bytes=40)
+    for text in ("a", "b", "c"):
+        now[0] += 10
+        store.put_many("model", {text: [1.0, 2.0, 3.0, 4.0]})
+    assert set(store.get_many("model", ["a", "b", "c"])) == {"b", "c"}
+    assert store.evictions == 1
+    assert store.stats()["bytes"] == 32
+
+
+def test_clear_empties_the_store(tmp_path):
+    store = main.EmbeddingStore(str(tmp_path / "store.db"), max_bytes=1 << 20)
+    store.put_many("model", {"a": [1.0], "b": [2.0]})
+    assert store.clear() == 2
+    assert store.stats()["entries"] == 0
+    assert store.stats()["bytes"] == 0
+
+
+def test_failed_clear_rolls_back_and_is_counted(tmp_path):
+    store = main.EmbeddingStore(str(tmp_path / "store.db"), max_bytes=1 << 20)
+    store.put_many("model", {"a": [1.0]})
+    failing = FailingConnection(store._connection())
+    store._local.db = failing
+    assert store.clear() == 0
+    assert failing.statements[-1] == "ROLLBACK"
+    assert store.errors == 1
+    # No transaction is left open on the connection
+    store._local.db = failing.db
+    store.put_many("model", {"b": [2.0]})
+    assert store.stats()["entries"] == 2
+
+
+def test_unusable_paths_disable_the_store(tmp_path):
+    (tmp_path / "file").write_text("")
+    assert main.open_embedding_store(str(tmp_path / "file" / "store.db"), 1 << 20) is None
+    assert main.open_embedding_store("", 1 << 20) is None
+
+
+def test_searches_reuse_stored_embeddings(tmp_path, monkeypatch):
+    store = main.EmbeddingStore(str(tmp_path / "store.db"), max_bytes=1 << 20)
+    monkeypatch.setattr(main.SearchSystem, "_embedding_store", store)
+    ollama_app = fake_ollama_app(DIM)
+
+    async def scenario(client, qdrant):
+        body = {"collection_name": COLLECTION, "search_queries": ["bgp routing", "nat policy"], "limit": 2}
+        first = await client.post("/search", json=body)
+        assert first.status_code == 200
+        # Writes run in the background; wait for them as shutdown does
+        await asyncio.gather(*main.AsyncSearchSystem._store_writes)
+        assert store.stats()["entries"] == 2
+
+        # A fresh worker: empty in-process caches, same store
+        main.SearchSystem._embedding_cache.invalidate()
+        main.AsyncSearchSystem._response_cache.invalidate()
+        second = await client.post("/search", json=body)
+        assert_same_results(second.json()["results"], first.json()["results"])
+        assert ollama_app.state.calls["texts"] == 2
+        stats = (await client.get("/cache/stats")).json()["embedding_store"]
+        assert stats["hits"] == 2
+    run_with_app(scenario, ollama_app)
@@ -0,0 +1,79 @@
+"""Fuzzy filename catalog behind /search/filenames."""
+import tracemalloc
+
+import pytest
+
+from support import COLLECTION, FILENAMES, main, run_with_app
+
+NAMES = [
+    "ECOS_9.3.6.0_Release_Notes_RevB.pdf",
+    "ECOS_9.3.7.0_Release_Notes.pdf",
+    "ECOS_9.4.1.0_Release_Notes.pdf",
+    "Orchestrator_9.3_User_Guide.pdf",
+    "EdgeConnect_Install_Guide.pdf",
+]
+
+
+def test_exact_match_scores_one_regardless_of_case():
+    catalog = main.FilenameCatalog(NAMES)
+    assert catalog.search("ecos_9.3.7.0_release_notes.pdf", 1) == [
+        {"filename": "ECOS_9.3.7.0_Release_Notes.pdf", "score": 1.0}
+    ]
+
+
+def test_queries_rank_by_token_containment_and_trigrams():
+    catalog = main.FilenameCatalog(NAMES)
+    matches = catalog.search("ecos 9.3", 10, min_score=0.5)
+    assert {m["filename"] for m in matches} == {"ECOS_9.3.6.0_Release_Notes_RevB.pdf", "ECOS_9.3.7.0_Release_Notes.pdf"}
+    assert catalog.search("install guide", 1)[0]["filename"] == "EdgeConnect_Install_Guide.pdf"
+    assert catalog.search("zzz", 10, min_score=0.1) == []
+
+
+def test_single_characters_and_substrings_of_tokens_match():
+    catalog = main.FilenameCatalog(NAMES)
+    scores = catalog.scores("b")
+    # "b" occurs in "RevB" only
+    assert scores[catalog.filenames.index("ECOS_9.3.6.0_Release_Notes_RevB.pdf")] > scores.min()
+    assert catalog.search("orchestr", 1)[0]["filename"] == "Orchestrator_9.3_User_Guide.pdf"
+
+
+def test_long_filenames_do_not_inflate_the_index():
+    names = ["A" * 50_000 + ".pdf"] + [f"Doc_{i}_Release_Notes.pdf" for i in range(2000)]
+    tracemalloc.start()
+    try:
+        catalog = main.FilenameCatalog(names)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Padding every token to the longest one would take gigabytes here
+    assert peak < 64 * 1024 * 1024
+    assert catalog.search("doc 17 release", 1)[0]["filename"] == "Doc_17_Release_Notes.pdf"
+    assert catalog.search("aaaa", 1)[0]["filename"] == names[0]
+
+
+@pytest.mark.parametrize("inline_max", [100_000, 0])
+def test_endpoint_single_and_batch_mode(monkeypatch, inline_max):
+    # 0 matches every request in a worker thread
+    monkeypatch.setattr(main, "FILENAME_MATCH_INLINE_MAX", inline_max)
+
+    async def scenario(client, qdrant):
+        single = await client.post("/search/filenames", json={
+            "collection_name": COLLECTION, "query": FILENAMES[3].lower(), "limit": 3
+        })
+        assert single.status_code == 200, single.text
+        assert single.json()["filenames"][0] == {"filename": FILENAMES[3], "score": 1.0}
+
+        batch = await client.post("/search/filenames", json={
+            "collection_name": COLLECTION, "queries": ["ecos 9.1", "release notes"], "limit": 3, "min_score": 0.0
+        })
+        assert batch.status_code == 200, batch.text
+        results = batch.json()["results"]
+        assert [r["query"] for r in results] == ["ecos 9.1", "release notes"]
+        assert results[0]["filenames"][0]["filename"] == "ECOS_9.1.0_Release_Notes.pdf"
+        assert all(r["total_matches"] == 3 for r in results)
+
+        both = await client.post("/search/filenames", json={
+            "collection_name": COLLECTION, "query": "ecos", "queries": ["ecos"]
+        })
+        assert both.status_code == 400
+    run_with_app(scenario)
@@ -0,0 +1,56 @@
+"""Compiled-filter cache and up-front rejection of invalid filters."""
+import pytest
+
+from support import COLLECTION, FILENAMES, main, run_with_app
+
+
+def test_equal_filters_compile_once(monkeypatch):
+    monkeypatch.setattr(main.SearchSystem, "_filter_cache", main.TTLCache(16, 0))
+    first = main.SearchSystem._build_filter_conditions(
+        {"metadata.filename": {"match_value": "a.pdf"}, "metadata.page_number": {"gte": 1, "lte": 5}}
+    )
+    # Key order does not matter
+    second = main.SearchSystem._build_filter_conditions(
+        {"metadata.page_number": {"lte": 5, "gte": 1}, "metadata.filename": {"match_value": "a.pdf"}}
+    )
+    assert second is first
+    stats = main.SearchSystem._filter_cache.stats()
+    assert (stats["misses"], stats["hits"], stats["size"]) == (1, 1, 1)
+    assert main.SearchSystem._build_filter_conditions(None) is None
+
+
+def test_context_scroll_filters_are_memoized(monkeypatch):
+    monkeypatch.setattr(main.SearchSystem, "_context_filter_cache", main.TTLCache(16, 0))
+    first = main.SearchSystem._context_scroll_filter("a.pdf", [(1, 3), (7, 9)])
+    assert main.SearchSystem._context_scroll_filter("a.pdf", [(1, 3), (7, 9)]) is first
+    assert main.SearchSystem._context_scroll_filter("a.pdf", [(1, 3)]) is not first
+
+
+@pytest.mark.parametrize("filter_dict", [
+    {"metadata.page_number": {"gte": 10, "lte": 1}},
+    {"metadata.page_number": 5},
+    {"metadata.filename": {"match_value": {"nested": 1}}},
+])
+def test_invalid_filters_are_rejected(filter_dict):
+    with pytest.raises(main.InvalidFilterError):
+        main.SearchSystem._build_filter_conditions(filter_dict)
+
+
+def test_invalid_filters_get_a_400_with_the_reason():
+    async def scenario(client, qdrant):
+        body = {"collection_name": COLLECTION, "search_queries": ["bgp"],
+                "filter": {"metadata.page_number": {"gte": 10, "lte": 1}}}
+        for path, payload in (
+            ("/search", body),
+            ("/search/batch", {"collection_name": COLLECTION,
+                               "searches": [{"search_queries": ["bgp"], "filter": body["filter"]}]}),
+        ):
+            response = await client.post(path, json=payload)
+            assert response.status_code == 400
+            assert "gte (10) > lte (1)" in response.json()["detail"]
+
+        valid = dict(body, filter={"metadata.filename": {"match_value": FILENAMES[0]}})
+        response = await client.post("/search", json=valid)
+        assert response.status_code == 200
+        assert {r["filename"] for r in response.json()["results"][0]} == {FILENAMES[0]}
+    run_with_app(scenario)
@@ -0,0 +1,71 @@
+"""Concurrent multi-file searches of the MCP server with per-file error isolation."""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+pytest.importorskip("fastmcp")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp-server"))
+import server
+
+
+def fake_api(failing: set, delay: float = 0.01):
+    """MockTransport handler for POST /search; filename filters in failing get a 500"""
+    state = {"active": 0, "peak": 0, "calls": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        filename_filter = body["filter"]["metadata.filename"]["match_text"]
+        state["calls"] += 1
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            state["active"] -= 1
+        if filename_filter in failing:
+            return httpx.Response(500, json={"detail": "Search processing failed"})
+        return httpx.Response(200, json={"results": [[{"filename": filename_filter, "score": 0.9}]]})
+
+    return handler, state
+
+
+def run_tool(handler, call):
+    async def run():
+        server._http_client = httpx.AsyncClient(base_url="http://api", transport=httpx.MockTransport(handler))
+        try:
+            return await call()
+        finally:
+            await server.close_http_client()
+    return asyncio.run(run())
+
+
+def test_failing_file_is_reported_without_failing_the_others(monkeypatch):
+    monkeypatch.setattr(server.config, "max_concurrent_requests", 2)
+    handler, state = fake_api({"ECOS_9.3.6"})
+    filters = ["ECOS_9.3.5", "ECOS_9.3.6", "ECOS_9.3.7", "ECOS_9.3.8", "ECOS_9.3.5"]
+    result = run_tool(handler, lambda: server.search_across_multiple_files("dhcp", filters))
+    assert set(result["results_by_file"]) == {"ECOS_9.3.5", "ECOS_9.3.7", "ECOS_9.3.8"}
+    assert result["results_by_file"]["ECOS_9.3.7"] == [{"filename": "ECOS_9.3.7", "score": 0.9}]
+    assert result["errors"] == {"ECOS_9.3.6": "HTTP 500: Search processing failed"}
+    # Duplicate filters are searched once, at most MAX_CONCURRENT_REQUESTS at a time
+    assert state["calls"] == 4
+    assert state["peak"] == 2
+
+
+def test_compare_versions_keeps_the_healthy_side():
+    handler, _ = fake_api({"ECOS_9.3.7.0"})
+    result = run_tool(handler, lambda: server.compare_versions("dhcp", "ECOS_9.3.6.0", "ECOS_9.3.7.0"))
+    assert result["version1"] == {"filename": "ECOS_9.3.6.0", "results": [{"filename": "ECOS_9.3.6.0", "score": 0.9}]}
+    assert result["version2"]["results"] == []
+    assert result["version2"]["error"] == "HTTP 500: Search processing failed"
+
+
+def test_all_files_succeeding_has_no_errors_key():
+    handler, _ = fake_api(set())
+    result = run_tool(handler, lambda: server.search_across_multiple_files("dhcp", ["a", "b"]))
+    assert "errors" not in result
+    assert list(result["results_by_file"]) == ["a", "b"]
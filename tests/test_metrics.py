@@ -0,0 +1,25 @@
+"""Prometheus /metrics: per-stage latency and bounded label values."""
+from support import COLLECTION, main, run_with_app
+
+
+def test_allowlist_folds_unknown_and_overflowing_values():
+    allowlist = main.LabelAllowlist(2, ("a",))
+    allowlist.add("b")
+    allowlist.add("c")
+    assert [allowlist.label(value) for value in ("a", "b", "c", "d")] == ["a", "b", "other", "other"]
+
+
+def test_stage_latencies_are_labeled_with_confirmed_values_only():
+    async def scenario(client, qdrant):
+        body = {"collection_name": COLLECTION, "search_queries": ["bgp routing"], "limit": 2}
+        assert (await client.post("/search", json=body)).status_code == 200
+        missing = dict(body, collection_name="no_such_collection_7f3a")
+        assert (await client.post("/search", json=missing)).status_code == 404
+
+        text = (await client.get("/metrics")).text
+        for stage in ("filter", "embedding", "vector_search", "context"):
+            assert f'search_api_stage_duration_seconds_count{{collection="{COLLECTION}",' \
+                   f'embedding_model="mxbai-embed-large",stage="{stage}"}}' in text
+        assert "no_such_collection_7f3a" not in text
+        assert 'search_api_results_total{collection="test_content",embedding_model="mxbai-embed-large"}' in text
+    run_with_app(scenario)
@@ -0,0 +1,102 @@
+"""Cross-request micro-batching of vector searches."""
+import asyncio
+import random
+
+from support import COLLECTION, assert_same_results, main, random_request, run_with_app
+
+
+class FakeSystem:
+    def __init__(self):
+        self.batches = []
+
+    async def _run_query_batch(self, queries, params, embedding_model):
+        self.batches.append(list(queries))
+        return [f"response to {query}" for query in queries]
+
+
+def test_submissions_are_grouped_by_key():
+    async def run():
+        batcher = main.QueryMicroBatcher(window=0.01, max_batch=64)
+        first, second = FakeSystem(), FakeSystem()
+        results = await asyncio.gather(
+            batcher.submit(("a",), first, ["q1", "q2"], {}, "model"),
+            batcher.submit(("a",), second, ["q3"], {}, "model"),
+            batcher.submit(("b",), second, ["q4"], {}, "model"),
+        )
+        assert results == [["response to q1", "response to q2"], ["response to q3"], ["response to q4"]]
+        # Batches run through the system that opened them
+        assert first.batches == [["q1", "q2", "q3"]]
+        assert second.batches == [["q4"]]
+        assert batcher.stats()["batches"] == 2
+    asyncio.run(run())
+
+
+def test_full_batches_flush_before_the_window():
+    async def run():
+        batcher = main.QueryMicroBatcher(window=60, max_batch=2)
+        system = FakeSystem()
+        results = await asyncio.wait_for(asyncio.gather(
+            batcher.submit(("a",), system, ["q1"], {}, "model"),
+            batcher.submit(("a",), system, ["q2"], {}, "model"),
+        ), timeout=5)
+        assert results == [["response to q1"], ["response to q2"]]
+    asyncio.run(run())
+
+
+def test_failures_reach_every_caller():
+    class FailingSystem:
+        async def _run_query_batch(self, queries, params, embedding_model):
+            raise RuntimeError("qdrant down")
+
+    async def run():
+        batcher = main.QueryMicroBatcher(window=0.01, max_batch=64)
+        system = FailingSystem()
+        outcomes = await asyncio.gather(
+            batcher.submit(("a",), system, ["q1"], {}, "model"),
+            batcher.submit(("a",), system, ["q2"], {}, "model"),
+            return_exceptions=True
+        )
+        assert [str(outcome) for outcome in outcomes] == ["qdrant down", "qdrant down"]
+    asyncio.run(run())
+
+
+def test_overrides_with_other_tls_settings_get_their_own_batches(monkeypatch):
+    endpoint = "https://qdrant.example.com:6333"
+    monkeypatch.setattr(main, "DEV_QDRANT_URL", endpoint)
+    monkeypatch.setattr(main, "DEV_QDRANT_VERIFY_SSL", True)
+    monkeypatch.setattr(main.SearchSystem, "_pooled_endpoints", {})
+    monkeypatch.setattr(main.AsyncSearchSystem, "_pooled_client_keys", {})
+    batcher = main.QueryMicroBatcher(window=0.05, max_batch=64)
+    monkeypatch.setattr(main.AsyncSearchSystem, "_query_batcher", batcher)
+
+    async def scenario(client, qdrant):
+        # The override without TLS verification is served by its own pooled client
+        pool = main.AsyncSearchSystem._custom_client_pool
+        pool.acquire((endpoint, False), lambda: qdrant)
+        pool.release((endpoint, False))
+        body = {"collection_name": COLLECTION, "search_queries": ["bgp routing"], "limit": 2}
+        responses = await asyncio.gather(
+            client.post("/search", json=body),
+            client.post("/search", json=dict(body, qdrant_url=endpoint, qdrant_verify_ssl=False))
+        )
+        assert [response.status_code for response in responses] == [200, 200]
+        assert batcher.batches == 2
+    run_with_app(scenario)
+
+
+def test_batched_searches_return_the_same_results(monkeypatch):
+    batcher = main.QueryMicroBatcher(window=0.02, max_batch=64)
+    monkeypatch.setattr(main.AsyncSearchSystem, "_query_batcher", batcher)
+
+    async def scenario(client, qdrant):
+        rng = random.Random(5)
+        requests = [dict(random_request(rng), filter=None) for _ in range(8)]
+        concurrent = await asyncio.gather(*(client.post("/search", json=body) for body in requests))
+        assert batcher.batches < len(requests)
+        monkeypatch.setattr(batcher, "window", 0)
+        for body, response in zip(requests, concurrent):
+            assert response.status_code == 200, response.text
+            main.AsyncSearchSystem._response_cache.invalidate()
+            single = await client.post("/search", json=body)
+            assert_same_results(response.json()["results"], single.json()["results"])
+    run_with_app(scenario)
@@ -0,0 +1,24 @@
+"""Startup warmup and the /ready probe."""
+from support import main, run_with_app
+
+
+def test_ready_reports_warmup_progress():
+    async def scenario(client, qdrant):
+        warmup = main.StartupWarmup()
+        original, main.startup_warmup = main.startup_warmup, warmup
+        try:
+            response = await client.get("/ready")
+            assert response.status_code == 503
+            warmup.start()
+            await warmup._task
+            response = await client.get("/ready")
+            assert response.status_code == 200
+            body = response.json()
+            assert body["status"] == "ready"
+            assert set(body["checks"].values()) == {"ok"}
+            assert body["preload"]["filename_catalogs"] == 1
+            await warmup.stop()
+            assert (await client.get("/ready")).status_code == 503
+        finally:
+            main.startup_warmup = original
+    run_with_app(scenario)
@@ -0,0 +1,21 @@
+"""refs and snippet response modes of /search."""
+from support import COLLECTION, assert_same_results, run_with_app
+
+
+def test_response_modes_reshape_full_results():
+    async def scenario(client, qdrant):
+        body = {"collection_name": COLLECTION, "search_queries": ["bgp routing", "memory leak crash"],
+                "limit": 4, "context_window_size": 3}
+        full = (await client.post("/search", json=body)).json()["results"]
+        refs = (await client.post("/search", json=dict(body, response_mode="refs"))).json()["results"]
+        snippets = (await client.post("/search", json=dict(body, response_mode="snippet", snippet_chars=200))).json()["results"]
+        for full_results, ref_results, snippet_results in zip(full, refs, snippets):
+            assert_same_results([ref_results], [[{k: v for k, v in r.items() if k != "combined_page"} for r in full_results]])
+            for full_result, snippet_result in zip(full_results, snippet_results):
+                text = full_result["combined_page"]
+                start, end = snippet_result["snippet_start"], snippet_result["snippet_end"]
+                assert snippet_result["snippet"] == text[start:end]
+                assert end - start <= 200
+                assert snippet_result["text_length"] == len(text)
+                assert "combined_page" not in snippet_result
+    run_with_app(scenario)
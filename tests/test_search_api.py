@@ -0,0 +1,79 @@
+"""
+/search against a reference copy of the original blocking pipeline (one
+embedding call per query, one context scroll per hit): the caching, batching
+and coalescing layers must not change any result.
+
+    python -m pytest -q tests
+"""
+import asyncio
+import json
+import random
+from typing import Dict, List, Optional
+
+from qdrant_client import AsyncQdrantClient, models
+
+from support import COLLECTION, DIM, assert_same_results, fake_embedding, main, random_request, run_with_app
+
+
+async def reference_batch_search(qdrant: AsyncQdrantClient, search_queries: List[str], filter: Optional[Dict],
+                                 limit: int, window: int) -> List[List[Dict]]:
+    """The original SearchSystem.batch_search: full payloads and one context scroll per hit"""
+    filter_ = main.SearchSystem(COLLECTION)._build_filter_conditions(filter)
+    batch_response = await qdrant.query_batch_points(
+        collection_name=COLLECTION,
+        requests=[
+            models.QueryRequest(query=fake_embedding(query, DIM), filter=filter_, limit=limit, with_payload=True)
+            for query in search_queries
+        ]
+    )
+    results = []
+    for query_response in batch_response:
+        query_results, seen_pages = [], set()
+        for scored_point in query_response.points:
+            payload = scored_point.payload
+            filename = payload["metadata"]["filename"]
+            center = payload["metadata"]["page_number"]
+            points, _ = await qdrant.scroll(
+                collection_name=COLLECTION,
+                scroll_filter=models.Filter(must=[
+                    models.FieldCondition(key="metadata.filename", match=models.MatchText(text=filename)),
+                    models.FieldCondition(key="metadata.page_number",
+                                          range=models.Range(gte=max(0, center - window), lte=min(1000, center + window)))
+                ]),
+                with_payload=True,
+                limit=2 * window + 1
+            )
+            unique_pages = []
+            for page in sorted((p.payload for p in points), key=lambda p: p["metadata"]["page_number"]):
+                page_id = (filename, page["metadata"]["page_number"])
+                if page_id not in seen_pages:
+                    unique_pages.append(page)
+                    seen_pages.add(page_id)
+            query_results.append({
+                "filename": filename,
+                "score": scored_point.score,
+                "center_page": center,
+                "combined_page": " ".join(p.get("pagecontent", "") for p in unique_pages),
+                "page_numbers": [p["metadata"]["page_number"] for p in unique_pages]
+            })
+        results.append(query_results)
+    # Same float encoding as the API response
+    return json.loads(json.dumps(results))
+
+
+def test_search_matches_reference_pipeline():
+    async def scenario(client, qdrant):
+        rng = random.Random(7)
+        requests = [random_request(rng) for _ in range(60)]
+        expected = [
+            await reference_batch_search(qdrant, body["search_queries"], body.get("filter"),
+                                         body["limit"], body["context_window_size"])
+            for body in requests
+        ]
+        # The second pass is served from the embedding, page and response caches
+        for _ in range(2):
+            responses = await asyncio.gather(*(client.post("/search", json=body) for body in requests))
+            for body, response, reference in zip(requests, responses, expected):
+                assert response.status_code == 200, response.text
+                assert_same_results(response.json()["results"], reference)
+    run_with_app(scenario)
@@ -0,0 +1,65 @@
+"""NDJSON and SSE streaming of /search results."""
+import asyncio
+import json
+import random
+
+from support import COLLECTION, assert_same_results, main, run_with_app, sample_queries
+
+
+def test_streaming_emits_the_same_results():
+    async def scenario(client, qdrant):
+        body = {"collection_name": COLLECTION, "search_queries": sample_queries(random.Random(3), 3),
+                "limit": 5, "context_window_size": 2}
+        expected = (await client.post("/search", json=body)).json()["results"]
+
+        response = await client.post("/search", json=dict(body, stream="ndjson"))
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert events[-1] == {"done": True, "result_count": sum(len(r) for r in expected)}
+        streamed = {event["query_index"]: event["results"] for event in events[:-1]}
+        assert_same_results([streamed[i] for i in range(len(expected))], expected)
+
+        response = await client.post("/search", json=dict(body, stream="sse"))
+        assert response.headers["content-type"].startswith("text/event-stream")
+        blocks = [block.split("\n") for block in response.text.strip().split("\n\n")]
+        assert [lines[0] for lines in blocks] == ["event: result"] * len(expected) + ["event: done"]
+        streamed = {}
+        for lines in blocks[:-1]:
+            event = json.loads(lines[1][len("data: "):])
+            streamed[event["query_index"]] = event["results"]
+        assert_same_results([streamed[i] for i in range(len(expected))], expected)
+    run_with_app(scenario)
+
+
+def test_stream_errors_are_reported_as_events():
+    async def scenario(client, qdrant):
+        response = await client.post("/search", json={
+            "collection_name": "missing_collection", "search_queries": ["bgp"], "stream": "ndjson"
+        })
+        assert response.status_code == 200
+        assert [json.loads(line) for line in response.text.splitlines()] == [
+            {"error": "Collection 'missing_collection' not found"}
+        ]
+        response = await client.post("/search", json={
+            "collection_name": COLLECTION, "search_queries": ["bgp"], "stream": "ndjson",
+            "use_production": True, "qdrant_url": "http://localhost:6333"
+        })
+        assert response.status_code == 400
+    run_with_app(scenario)
+
+
+def test_override_client_is_only_checked_out_while_streaming():
+    async def run():
+        pool = main.AsyncSearchSystem._custom_client_pool
+        request = main.SearchRequest(
+            collection_name=COLLECTION, search_queries=["bgp"], stream="ndjson",
+            qdrant_url="http://127.0.0.1:1", qdrant_verify_ssl=False
+        )
+        response = await main.search(None, request, True)
+        # A response that is never sent holds no client
+        assert all(in_use == 0 for _, in_use, _ in pool._entries.values())
+        events = [json.loads(chunk) async for chunk in response.body_iterator]
+        assert "error" in events[-1]
+        assert pool._entries and all(in_use == 0 for _, in_use, _ in pool._entries.values())
+        await pool.close_all()
+    asyncio.run(run())
@@ -0,0 +1,45 @@
+"""Two-stage search: coarse-vector prefetch rescored with the full-precision vector."""
+from qdrant_client import models
+
+from support import COLLECTION, CORPUS, DIM, assert_same_results, main, run_with_app
+
+
+def two_stage_system(**tuning):
+    return main.SearchSystem(COLLECTION, search_tuning=dict({"two_stage": True, "prefetch_oversampling": 4}, **tuning))
+
+
+def test_prefetch_candidates_scale_with_the_limit(monkeypatch):
+    monkeypatch.setattr(main, "COARSE_VECTOR_NAME", "coarse")
+    monkeypatch.setattr(main, "DENSE_VECTOR_NAME", "dense")
+    names = frozenset({"coarse", "dense"})
+    params = two_stage_system()._query_params(None, 5, names)
+    assert params["using"] == "dense"
+    assert params["coarse"][2] == 20
+    # A null limit is Qdrant's default of 10 results
+    params = two_stage_system()._query_params(None, None, names)
+    assert (params["limit"], params["coarse"][2]) == (10, 40)
+    # Collections without the coarse vector are searched in one stage
+    assert "coarse" not in two_stage_system()._query_params(None, 5, frozenset({"dense"}))
+
+
+def test_two_stage_search_returns_the_single_stage_results(monkeypatch):
+    monkeypatch.setattr(main, "COARSE_VECTOR_NAME", "coarse")
+    monkeypatch.setattr(main, "DENSE_VECTOR_NAME", "dense")
+
+    async def scenario(client, qdrant):
+        await qdrant.delete_collection(COLLECTION)
+        params = models.VectorParams(size=DIM, distance=models.Distance.COSINE)
+        await qdrant.create_collection(COLLECTION, vectors_config={"dense": params, "coarse": params})
+        await qdrant.upsert(COLLECTION, [
+            models.PointStruct(id=point.id, vector={"dense": point.vector, "coarse": point.vector},
+                               payload=point.payload)
+            for point in CORPUS
+        ])
+        body = {"collection_name": COLLECTION, "search_queries": ["bgp routing", "memory leak"],
+                "context_window_size": 1}
+        expected = await client.post("/search", json=dict(body, limit=10))
+        for limit in (None, 10):
+            response = await client.post("/search", json=dict(body, limit=limit, search_params={"two_stage": True}))
+            assert response.status_code == 200, response.text
+            assert_same_results(response.json()["results"], expected.json()["results"])
+    run_with_app(scenario)